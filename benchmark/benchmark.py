@@ -0,0 +1,210 @@
+#!../venv/bin/python3
+
+# Benchmarks WallboxModbus against a local WallboxSimulator.
+#
+#   python3 benchmark/benchmark.py                          # print results as JSON
+#   python3 benchmark/benchmark.py --save-baseline          # store results as the baseline
+#   python3 benchmark/benchmark.py --compare                # fail on regressions against the baseline
+#
+# The baseline depends on the machine, so none is committed: save one on the
+# machine that runs --compare, from a known good commit, and save it again after
+# intended performance changes.
+#
+# Client and simulator share one event loop, so the numbers measure the
+# client and simulator overhead on top of a loopback round trip.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from simulator.simulator import MAX_UNIT_ID, WallboxSimulator
+from wallbox_modbus import WallboxFleet, WallboxModbus
+from wallbox_modbus.constants import SetpointType
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+HOST = '127.0.0.1'
+
+GETTERS = [
+    ('get_firmware_version', ()),
+    ('get_serial_number', ()),
+    ('get_part_number', ()),
+    ('has_control', ()),
+    ('is_auto_charging_discharging_enabled', ()),
+    ('get_setpoint_type', ()),
+    ('is_charger_locked', ()),
+    ('is_charging_discharging', ()),
+    ('get_current_setpoint', ()),
+    ('get_power_setpoint', ()),
+    ('get_max_available_current', ()),
+    ('get_max_available_power', ()),
+    ('get_ac_current_rms', ()),
+    ('get_ac_voltage_rms', ()),
+    ('get_ac_active_power_rms', ()),
+    ('is_car_connected', ()),
+    ('get_state_of_charge', ()),
+    ('get_all_values', ()),
+    ('get_snapshot', ()),
+]
+
+# reboot_charger and update_firmware are left out, they would invalidate the
+# identity on every call
+SETTERS = [
+    ('take_control', ()),
+    ('release_control', ()),
+    ('enable_auto_charging_discharging', ()),
+    ('disable_auto_charging_discharging', ()),
+    ('set_setpoint_type', (SetpointType.CURRENT,)),
+    ('lock_charger', ()),
+    ('unlock_charger', ()),
+    ('start_charging_discharging', ()),
+    ('stop_charging_discharging', ()),
+    ('set_current_setpoint', (16,)),
+    ('set_power_setpoint', (3700,)),
+]
+
+# metrics for which a higher value is better, for all others lower is better
+HIGHER_IS_BETTER = ('snapshots_per_second',)
+
+
+async def measure_latency(wallbox, method, args, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await getattr(wallbox, method)(*args)
+        samples.append(time.perf_counter() - start)
+    return {
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+async def measure_snapshots_per_second(wallbox, duration):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        await wallbox.get_all_values()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+async def measure_fleet_sweep(port, size, sweeps, port_range):
+    # every wallbox of the fleet is a separate simulated charger, by unit id or,
+    # with port_range, on its own port
+    fleet = WallboxFleet(
+        {
+            f'charger{i}': WallboxModbus(HOST, port + i) if port_range else WallboxModbus(HOST, port, unit_id=i + 1)
+            for i in range(size)
+        },
+        timeout=30,
+    )
+    try:
+        await fleet.connect_all()
+        samples = []
+        for _ in range(sweeps):
+            start = time.perf_counter()
+            results = await fleet.snapshot_all()
+            samples.append(time.perf_counter() - start)
+            if results.errors:
+                raise RuntimeError(f'{len(results.errors)} chargers failed during the fleet sweep')
+        return statistics.median(samples) * 1000
+    finally:
+        fleet.close()
+
+async def run(args):
+    chargers = max([1, *args.fleet_sizes])
+    port_range = chargers > MAX_UNIT_ID
+    simulator = WallboxSimulator()
+    await simulator.setup(HOST, args.port, chargers, port_range)
+    server = asyncio.create_task(simulator.run())
+    await asyncio.sleep(0.1)
+    wallbox = WallboxModbus(HOST, args.port)
+    results = {'latency': {}, 'fleet_sweep_ms': {}}
+    try:
+        await wallbox.connect()
+        for method, method_args in GETTERS + SETTERS:
+            results['latency'][method] = await measure_latency(wallbox, method, method_args, args.iterations)
+        results['snapshots_per_second'] = await measure_snapshots_per_second(wallbox, args.duration)
+        for size in args.fleet_sizes:
+            results['fleet_sweep_ms'][str(size)] = await measure_fleet_sweep(args.port, size, args.sweeps, port_range)
+    finally:
+        wallbox.close()
+        await simulator.shutdown()
+        server.cancel()
+    return results
+
+
+def percentile(samples, percent):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, round(percent / 100 * (len(samples) - 1)))
+    return samples[index]
+
+def flatten(results, prefix=''):
+    metrics = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            metrics[f'{prefix}{key}'] = value
+    return metrics
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    # returns a list of descriptions of the metrics that regressed by more than
+    # tolerance; timings that differ less than min_delta_ms are considered noise
+    regressions = []
+    current = flatten(results)
+    for name, reference in flatten(baseline).items():
+        if name not in current or not reference:
+            continue
+        value = current[name]
+        if name.endswith('_ms') and abs(value - reference) < min_delta_ms:
+            continue
+        if name.startswith(HIGHER_IS_BETTER):
+            change = (reference - value) / reference
+        else:
+            change = (value - reference) / reference
+        if change > tolerance:
+            regressions.append(f'{name}: {value:.3f} vs baseline {reference:.3f} ({change:+.0%})')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark WallboxModbus against the local simulator')
+    parser.add_argument('--port', type=int, default=5021, help='simulator port, fleets over 247 chargers use one port each from here')
+    parser.add_argument('--iterations', type=int, default=200, help='calls per getter/setter')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds to measure snapshots/sec')
+    parser.add_argument('--fleet-sizes', type=int, nargs='*', default=[1, 10, 100, 500])
+    parser.add_argument('--sweeps', type=int, default=5, help='fleet sweeps per fleet size')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression, 0.2 is 20%%')
+    parser.add_argument('--min-delta-ms', type=float, default=0.1, help='timing differences considered noise')
+    args = parser.parse_args()
+    if args.compare and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f'no baseline at {args.baseline}, run with --save-baseline on a known good commit first')
+
+    results = asyncio.run(run(args))
+    results['environment'] = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        baseline.pop('environment', None)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,59 +1,158 @@
 #!../venv/bin/python3
 
+import argparse
 import asyncio
+import bisect
+import collections
+import functools
 import logging
+import math
+import random
+import time
 from pymodbus import pymodbus_apply_logging_config
 from pymodbus.datastore import (
     ModbusSequentialDataBlock,
     ModbusServerContext,
     ModbusSlaveContext,
 )
-from pymodbus.register_write_message import (
-    WriteMultipleRegistersRequest,
-    WriteSingleRegisterRequest,
-)
+from pymodbus.pdu import ModbusExceptions
 from pymodbus.server import ModbusTcpServer
+from pymodbus.server.async_io import ModbusServerRequestHandler
 
 #pymodbus_apply_logging_config(logging.DEBUG)
 
+log = logging.getLogger(__name__)
+
+WRITE_SINGLE_REGISTER = 0x6
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+# charger status values used by the simulation
+CHARGING = 1
+CONNECTED_WAITING_FOR_CAR_DEMAND = 2
+DISCHARGING = 11
+
+# unit ids 1..247 address a device, the others are reserved
+MAX_UNIT_ID = 247
+
 class WallboxSimulator:
 
-    server: ModbusTcpServer
+    # Simulates one or more chargers. With several chargers they are served either
+    # as unit ids 1..N of one server, or with port_range on ports port..port+N-1.
+    # More than MAX_UNIT_ID chargers need port_range.
+
+    # With speedup, the chargers are simulated in time_step increments of simulated
+    # time, running speedup times faster than real time. advance() steps the
+    # simulation by hand, e.g. to replay a charging session deterministically.
+
+    def __init__(self, trace=0, speedup=None, time_step=1.0, faults=None):
+        self.chargers = []
+        self.servers = []
+        self.faults = faults    # optional FaultInjection, applied to every server
+        # with trace, the latest trace requests are kept as (time.monotonic(), request)
+        self.trace = collections.deque(maxlen=trace) if trace else None
+        self.speedup = speedup
+        self.time_step = time_step
+        self.time = 0.0     # simulated seconds
+
+    async def setup(self, address='', port=5020, chargers=1, port_range=False):
+        if not port_range and chargers > MAX_UNIT_ID:
+            raise ValueError(f"{chargers} chargers do not fit in unit ids 1..{MAX_UNIT_ID}, use port_range")
+        if port_range or chargers == 1:
+            for index in range(chargers):
+                charger = SimulatedCharger(index)
+                self.chargers.append(charger)
+                context = ModbusServerContext(slaves=charger.slave, single=True)
+                self._add_server(context, address, port + index, {None: charger})
+        else:
+            units = {unit_id: SimulatedCharger(unit_id - 1) for unit_id in range(1, chargers + 1)}
+            self.chargers.extend(units.values())
+            slaves = {unit_id: charger.slave for unit_id, charger in units.items()}
+            context = ModbusServerContext(slaves=slaves, single=False)
+            self._add_server(context, address, port, units)
+        self.server = self.servers[0]
+        self.context = self.server.context
+
+    def _add_server(self, context, address, port, units):
+        # units maps unit ids to chargers, None when one charger answers every unit id
+        server = ModbusTcpServer if self.faults is None else FaultInjectingServer
+        self.servers.append(server(
+            context=context,
+            address=(address, port),
+            request_tracer=functools.partial(self._server_request_tracer, units),
+        ))
+        self.servers[-1].faults = self.faults
+
+    async def run(self):
+        tasks = [server.serve_forever() for server in self.servers]
+        if self.speedup:
+            tasks.append(self._simulate())
+        await asyncio.gather(*tasks)
+
+    def advance(self, seconds):
+        for _ in range(round(seconds / self.time_step)):
+            for charger in self.chargers:
+                charger.advance(self.time_step)
+            self.time += self.time_step
 
-    def __init__(self):
+    async def _simulate(self):
+        # keeps simulated time at speedup times the real time that passed, in whole steps
+        start = time.monotonic() - self.time / self.speedup
+        while True:
+            behind = (time.monotonic() - start) * self.speedup - self.time
+            if behind >= self.time_step:
+                self.advance(behind // self.time_step * self.time_step)
+            await asyncio.sleep(self.time_step / self.speedup)
+
+    async def shutdown(self):
+        for server in self.servers:
+            await server.shutdown()
+
+    def _server_request_tracer(self, units, request, *_addr):
+        # called for every request, before it is executed
+        if self.trace is not None:
+            self.trace.append((time.monotonic(), request))
+        function_code = request.function_code
+        if function_code == WRITE_SINGLE_REGISTER:
+            values = [request.value]
+        elif function_code == WRITE_MULTIPLE_REGISTERS:
+            values = request.values
+        else:
+            return
+        charger = units.get(None) or units.get(request.slave_id)
+        if charger is not None:
+            charger.process_write_registers(request.address, values)
+
+
+class SimulatedCharger:
+
+    # The registers of one charger, index makes its serial and part number unique.
+    # advance() drives the measurements and the state of charge of the connected
+    # car from the setpoints, like a charger running at full efficiency.
+
+    def __init__(self, index=0, battery_capacity=60000):
+        self.index = index
+        self.battery_capacity = battery_capacity    # Wh
+        self.energy = 0.55 * battery_capacity       # Wh in the car battery
+        self.slave = ModbusSlaveContext(hr=ModbusSequentialDataBlock(0x00, [0] * 547))
         # callback functions for handling writes to write registers
         self._write_handlers = {
             0x51:  self._handle_set_control,
             # 0x53:  self._handle_set_setpoint_type, -- ignore when user control?
             0x101: self._handle_set_action
         }
-
-    async def setup(self):
-        datablock = ModbusSequentialDataBlock(0x00, [0] * 547)
-        context = ModbusSlaveContext(hr=datablock)
-        self.context = ModbusServerContext(slaves=context, single=True)
-        self.server = ModbusTcpServer(
-            context=self.context, 
-            address=('', 5020), 
-            request_tracer=self._server_request_tracer,
-        )
+        self._handled_addresses = sorted(self._write_handlers)
         self._set_modbus_values_initial()
         self._set_modbus_values_connected_idle()
 
-    async def run(self):
-        await self.server.serve_forever()
-
     def _set_modbus_values_initial(self):
+        serial_number = (5<<16) + 19659 + self.index
+        # 'abcdefgh' followed by the index as 4 hex digits
+        part_number = f'abcdefgh{self.index:04x}'.encode('latin-1')
         self._set_modbus_values(0x1, [
             3400,  # 0x1: firmware version
-            5,     # 0x2: s/n high
-            19659, # 0x3: s/n low
-            (97<<8)+98,
-            (99<<8)+100,
-            (101<<8)+102,
-            (103<<8)+104,
-            (105<<8)+106,
-            (107<<8)+108,
+            serial_number >> 16,    # 0x2: s/n high
+            serial_number & 0xffff, # 0x3: s/n low
+            *((part_number[i]<<8)+part_number[i+1] for i in range(0, 12, 2)),  # 0x4-0x9: part number
         ])
         self._set_modbus_values(0x50, [
             5020, # 0x50: communication port (uint16  502, 1024-65535)
@@ -101,7 +200,7 @@ class WallboxSimulator:
         ])
         self._set_modbus_values(0x219, [
             4,    # 0x219: charger status (4: connected, paused by user)
-            55,   # 0x21a: state of charge
+            self._state_of_charge(), # 0x21a: state of charge
         ])
 
     def _set_modbus_values_connected_charging(self):
@@ -111,52 +210,190 @@ class WallboxSimulator:
         ])
         self._set_modbus_values(0x219, [
             1,    # 0x219: charger status (1: charging)
-            33,   # 0x21a: state of charge
+            self._state_of_charge(), # 0x21a: state of charge
         ])
 
     def _set_modbus_values(self, start_address, values):
         fc_as_hex = 0x3
-        slave_id = 0
-        self.context[slave_id].setValues(fc_as_hex, start_address, values)
-
-    def _server_request_tracer(self, request, *_addr):
-        print(f"---> REQUEST: {request}")
-        if isinstance(request, WriteMultipleRegistersRequest):
-            self._process_write_registers(request.address, request.values)
-        if isinstance(request, WriteSingleRegisterRequest):
-            self._process_write_registers(request.address, [request.value])
-
-    def _process_write_registers(self, start_address, values):
-        for address in range(start_address, start_address+len(values)):
-            if address in self._write_handlers:
-                cur = self._get_modbus_value(address)
-                new = values[address-start_address]
-                if cur != new:
-                    self._write_handlers[address](address, new)
-
-    def _get_modbus_value(self, address):
+        self.slave.setValues(fc_as_hex, start_address, values)
+
+    def _get_modbus_values(self, start_address, count):
+        fc_as_hex = 0x3
+        return self.slave.getValues(fc_as_hex, start_address, count)
+
+    def _state_of_charge(self):
+        return round(100 * self.energy / self.battery_capacity)
+
+    def advance(self, seconds):
+        state = self._get_modbus_values(0x219, 1)[0]
+        if state not in (CHARGING, DISCHARGING):
+            return
+        setpoint_type = self._get_modbus_values(0x53, 1)[0]
+        current_setpoint, _, power_setpoint = map(to_int16, self._get_modbus_values(0x102, 3))
+        max_current, _, max_power = self._get_modbus_values(0x200, 3)
+        voltage = self._get_modbus_values(0x20a, 1)[0]
+        if setpoint_type == 0: # current
+            current = max(-max_current, min(current_setpoint, max_current))
+            power = current * voltage
+        else: # power by phase
+            power = max(-max_power, min(power_setpoint, max_power))
+            current = round(power / voltage) if voltage else 0
+        self.energy = max(0, min(self.energy + power * seconds / 3600, self.battery_capacity))
+        if (power > 0 and self.energy >= self.battery_capacity) or (power < 0 and self.energy <= 0):
+            current = power = 0
+            state = CONNECTED_WAITING_FOR_CAR_DEMAND
+        else:
+            state = DISCHARGING if power < 0 else CHARGING
+        self._set_modbus_values(0x207, [current & 0xffff])
+        self._set_modbus_values(0x20e, [power & 0xffff])
+        self._set_modbus_values(0x219, [state, self._state_of_charge()])
+
+    def process_write_registers(self, start_address, values):
+        end_address = start_address + len(values)
+        first = bisect.bisect_left(self._handled_addresses, start_address)
+        last = bisect.bisect_left(self._handled_addresses, end_address, first)
+        if first == last:
+            return
         fc_as_hex = 0x3
-        slave_id = 0
-        return self.context[slave_id].getValues(fc_as_hex, address)[0]
+        current = self.slave.getValues(fc_as_hex, start_address, len(values))
+        for address in self._handled_addresses[first:last]:
+            cur = current[address-start_address]
+            new = values[address-start_address]
+            if cur != new:
+                self._write_handlers[address](address, new)
 
     def _handle_set_control(self, address, value):
-        print(f"--> set control {address} -> {value}")
+        log.debug("set control %#x -> %s", address, value)
         if value == 0: # user
             self._set_modbus_values_control_user()
         elif value == 1: # remote
             self._set_modbus_values_control_remote()
 
     def _handle_set_action(self, address, value):
-        print(f"--> set action {address} -> {value}")
+        log.debug("set action %#x -> %s", address, value)
         if value == 1: # start (dis)charging
             self._set_modbus_values_connected_charging()
         elif value == 2: # stop (dis)charging
             self._set_modbus_values_connected_idle()
        
 
+class FaultInjection:
+
+    # What goes wrong, and how slowly, when a request is answered. Every request gets
+    # a delay of latency(rng) plus the delay of its function code, and then, with the
+    # given rates, is dropped (no response), has its connection reset, or is answered
+    # with exception_code. With a seed the faults are the same in every run, given
+    # the same order of requests.
+
+    def __init__(self, latency=None, delays=None, drop_rate=0.0, reset_rate=0.0, exception_rate=0.0,
+                 exception_code=ModbusExceptions.SlaveBusy, seed=None):
+        self.latency = latency          # callable(rng) -> seconds, e.g. uniform_latency(0.02, 0.3)
+        self.delays = dict(delays or {})    # function code -> extra seconds
+        self.drop_rate = drop_rate
+        self.reset_rate = reset_rate
+        self.exception_rate = exception_rate
+        self.exception_code = exception_code
+        self.rng = random.Random(seed)
+        self.dropped = 0
+        self.resets = 0
+        self.exceptions = 0
+
+    def decide(self, function_code):
+        # returns (delay, fault), fault is None, 'drop', 'reset' or 'exception'
+        delay = self.delays.get(function_code, 0.0)
+        if self.latency is not None:
+            delay += self.latency(self.rng)
+        roll = self.rng.random()
+        if roll < self.drop_rate:
+            self.dropped += 1
+            return delay, 'drop'
+        roll -= self.drop_rate
+        if roll < self.reset_rate:
+            self.resets += 1
+            return delay, 'reset'
+        roll -= self.reset_rate
+        if roll < self.exception_rate:
+            self.exceptions += 1
+            return delay, 'exception'
+        return delay, None
+
+
+def uniform_latency(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+def lognormal_latency(median, sigma=0.5, maximum=None):
+    # long tailed, like a charger on Wi-Fi
+    def latency(rng):
+        value = rng.lognormvariate(math.log(median), sigma)
+        return value if maximum is None else min(value, maximum)
+    return latency
+
+
+class FaultInjectingServer(ModbusTcpServer):
+
+    faults: FaultInjection
+
+    def callback_new_connection(self):
+        return _FaultInjectingRequestHandler(self)
+
+
+class _FaultInjectingRequestHandler(ModbusServerRequestHandler):
+
+    # pymodbus has no public hook that runs asynchronously before a response is
+    # sent, so this overrides its private _async_execute; the fault injection tests
+    # in test_simulator.py fail when an upgrade of the pinned pymodbus changes it
+
+    async def _async_execute(self, request, *addr):
+        delay, fault = self.server.faults.decide(request.function_code)
+        if delay:
+            await asyncio.sleep(delay)
+        if fault == 'drop':
+            return
+        if fault == 'reset':
+            abort = getattr(self.transport, 'abort', None)
+            abort() if abort is not None else self.close()
+            return
+        if fault == 'exception':
+            response = request.doException(self.server.faults.exception_code)
+            response.transaction_id = request.transaction_id
+            response.slave_id = request.slave_id
+            self.server_send(response, *addr)
+            return
+        await super()._async_execute(request, *addr)
+
+
+def to_int16(value):
+    return value - 0x10000 if value & 0x8000 else value
+
+
 async def main():
-    simulator = WallboxSimulator()
-    await simulator.setup()
+    parser = argparse.ArgumentParser(description='Simulate Wallbox Quasar chargers')
+    parser.add_argument('--address', default='')
+    parser.add_argument('--port', type=int, default=5020)
+    parser.add_argument('--chargers', type=int, default=1, help='number of simulated chargers')
+    parser.add_argument('--port-range', action='store_true',
+                        help='serve every charger on its own port instead of as a unit id')
+    parser.add_argument('--speedup', type=float, help='simulate charging, this many times faster than real time')
+    parser.add_argument('--time-step', type=float, default=1.0, help='simulated seconds per step')
+    parser.add_argument('--latency', type=float, nargs=2, metavar=('LOW', 'HIGH'),
+                        help='answer after a uniformly distributed delay, in seconds')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='fraction of requests not answered')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='fraction of requests that reset the connection')
+    parser.add_argument('--exception-rate', type=float, default=0.0, help='fraction of requests answered with an exception')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    faults = None
+    if args.latency or args.drop_rate or args.reset_rate or args.exception_rate:
+        faults = FaultInjection(
+            latency=uniform_latency(*args.latency) if args.latency else None,
+            drop_rate=args.drop_rate,
+            reset_rate=args.reset_rate,
+            exception_rate=args.exception_rate,
+            seed=args.seed,
+        )
+    simulator = WallboxSimulator(speedup=args.speedup, time_step=args.time_step, faults=faults)
+    await simulator.setup(args.address, args.port, args.chargers, args.port_range)
     await simulator.run()
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -25,3 +25,21 @@ async def fake_wallbox_modbus_server(context):
     asyncio.create_task(server.serve_forever())
     yield server
     await server.shutdown()
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def set_server_values(server, start_address, values, unit_id=0):
+    fc_as_hex = 0x3
+    return server.context[unit_id].setValues(fc_as_hex, start_address, values)
+
+def get_server_value(server, address, unit_id=0):
+    fc_as_hex = 0x3
+    return server.context[unit_id].getValues(fc_as_hex, address)[0]
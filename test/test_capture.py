@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus.capture import ReplayServer, TrafficRecorder, TrafficRecording
+from wallbox_modbus.constants import RegisterAddresses
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+from conftest import set_server_values
+
+pytestmark = pytest.mark.asyncio
+
+REPLAY_PORT = 5021
+
+
+async def record(path, server):
+    recorder = TrafficRecorder(path)
+    wallbox = WallboxModbus(NULLMODEM_HOST, traffic_recorder=recorder)
+    await wallbox.connect()
+    for state_of_charge in [40, 41]:
+        set_server_values(server, RegisterAddresses.STATE_OF_CHARGE, [state_of_charge])
+        await wallbox.get_state_of_charge()
+    await wallbox.set_current_setpoint(16)
+    wallbox.close()
+    recorder.close()
+
+
+@pytest_asyncio.fixture
+async def replay_server(tmp_path, fake_wallbox_modbus_server):
+    await record(tmp_path / 'charger.cap', fake_wallbox_modbus_server)
+    server = ReplayServer(TrafficRecording(tmp_path / 'charger.cap'), (NULLMODEM_HOST, REPLAY_PORT), speed=None)
+    asyncio.create_task(server.serve_forever())
+    yield server
+    await server.shutdown()
+
+
+async def test_record(tmp_path, fake_wallbox_modbus_server):
+    # Act
+    await record(tmp_path / 'charger.cap', fake_wallbox_modbus_server)
+
+    # Assert
+    recording = TrafficRecording(tmp_path / 'charger.cap')
+    identity, first, second, write = recording
+    assert len(recording) == 4
+    assert identity.request == bytes([0x3, 0, RegisterAddresses.FIRMWARE_VERSION, 0, 9])
+    assert first.response == bytes([0x3, 2, 0, 40])
+    assert second.response == bytes([0x3, 2, 0, 41])
+    assert write.request == write.response == bytes([0x6, 0x1, 0x2, 0, 16])
+    assert all(exchange.unit_id == 1 and exchange.duration >= 0 for exchange in recording)
+
+async def test_replay_in_order(replay_server):
+    # Arrange
+    wallbox = WallboxModbus(NULLMODEM_HOST, port=REPLAY_PORT)
+    await wallbox.connect()
+
+    # Act
+    values = [await wallbox.get_state_of_charge() for _ in range(3)]
+    await wallbox.set_current_setpoint(16)
+    wallbox.close()
+
+    # Assert
+    assert values == [40, 41, 40]
+    assert (replay_server.answered, replay_server.unknown) == (5, 0)
+
+async def test_unrecorded_request(replay_server):
+    wallbox = WallboxModbus(NULLMODEM_HOST, port=REPLAY_PORT)
+    await wallbox.connect()
+    result = await wallbox._read(RegisterAddresses.CONTROL)
+    wallbox.close()
+    assert result.isError()
+    assert replay_server.unknown == 1
+
+async def test_replay_timing(tmp_path, fake_wallbox_modbus_server):
+    # Arrange
+    await record(tmp_path / 'charger.cap', fake_wallbox_modbus_server)
+    recording = TrafficRecording(tmp_path / 'charger.cap')
+    server = ReplayServer(recording, speed=1.0)
+    _, first, second, _ = recording
+
+    # Act
+    _, response = server.answer(1, first.request)
+
+    # Assert
+    assert response == first.response
+    server._start -= second.timestamp - recording.exchanges[0].timestamp + 1
+    assert server.answer(1, first.request) == (second.duration, second.response)
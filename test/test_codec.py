@@ -0,0 +1,48 @@
+import pytest
+from wallbox_modbus.codec import get_decoder
+from wallbox_modbus.constants import Action, ChargerStates, Control, RegisterAddresses
+
+
+def test_decode_identity_block():
+    decoder = get_decoder(RegisterAddresses.FIRMWARE_VERSION, 9)
+    values = decoder.decode([2345, 357, 60437, (33<<8)+34, (35<<8)+36, (37<<8)+38, (39<<8)+40, (41<<8)+42, (43<<8)+44])
+    assert values == (2345, 23456789, '!"#$%&\'()*+,')
+
+def test_decode_signed_values_and_enums():
+    decoder = get_decoder(RegisterAddresses.CHARGER_LOCK_STATE, 5)
+    values = decoder.decode([1, 2, 65536 - 23, 0, 65536 - 2345])
+    assert values == (1, Action.STOP_CHARGING_DISCHARGING, -23, -2345)
+    assert isinstance(values[1], Action)
+
+def test_decode_unknown_enum_value():
+    decoder = get_decoder(RegisterAddresses.CHARGER_LOCK_STATE, 2)
+    assert decoder.decode([0, 0]) == (0, 0)
+
+def test_decode_selected_fields():
+    decoder = get_decoder(RegisterAddresses.CONTROL, 0x21a - 0x51 + 1, (RegisterAddresses.CHARGER_STATE, RegisterAddresses.CONTROL))
+    registers = [0] * (0x21a - 0x51 + 1)
+    registers[0] = Control.REMOTE
+    registers[0x219 - 0x51] = ChargerStates.CHARGING
+    assert decoder.decode_dict(registers) == {
+        RegisterAddresses.CONTROL: Control.REMOTE,
+        RegisterAddresses.CHARGER_STATE: ChargerStates.CHARGING,
+    }
+
+def test_decoders_are_cached():
+    assert get_decoder(RegisterAddresses.CONTROL, 3) is get_decoder(RegisterAddresses.CONTROL, 3)
+
+def test_field_outside_block():
+    with pytest.raises(ValueError):
+        get_decoder(RegisterAddresses.SERIAL_HIGH, 1, (RegisterAddresses.SERIAL_HIGH,))
+
+def test_fields_inside_another_field_are_raw():
+    decoder = get_decoder(RegisterAddresses.SERIAL_HIGH, 8, (
+        RegisterAddresses.SERIAL_HIGH, RegisterAddresses.SERIAL_LOW,
+        RegisterAddresses.PART_NUMBER_1, RegisterAddresses.PART_NUMBER_2,
+    ))
+    values = decoder.decode([357, 60437, (33<<8)+34, (35<<8)+36, (37<<8)+38, (39<<8)+40, (41<<8)+42, (43<<8)+44])
+    assert values == (23456789, 60437, '!"#$%&\'()*+,', (35<<8)+36)
+
+def test_field_outside_block_message():
+    with pytest.raises(ValueError, match='Field 0x2 does not fit in block 0x2\\+1'):
+        get_decoder(RegisterAddresses.SERIAL_HIGH, 1, (RegisterAddresses.SERIAL_HIGH,))
@@ -0,0 +1,60 @@
+import pytest
+from wallbox_modbus.connection import CircuitBreaker, CircuitOpenError, ReconnectPolicy
+from conftest import FakeClock
+
+
+def test_circuit_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=FakeClock())
+    breaker.check()
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+def test_half_open_after_reset_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.now = 20
+    breaker.check()
+    breaker.record_success()
+    assert not breaker.is_open
+
+def test_one_trial_at_a_time_when_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    # the trial never reported back
+    clock.now = 20
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_success()
+    breaker.check()
+    breaker.check()
+
+def test_jittered_exponential_backoff():
+    policy = ReconnectPolicy(backoff=0.1, max_backoff=1.0, jitter=0.5, rng=lambda: 1.0)
+    assert [policy.delay(attempt) for attempt in range(5)] == pytest.approx([0.05, 0.1, 0.2, 0.4, 0.5])
+    policy = ReconnectPolicy(backoff=0.1, jitter=0.5, rng=lambda: 0.0)
+    assert policy.delay(2) == pytest.approx(0.4)
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus import WallboxFleet, WallboxModbus
+from wallbox_modbus.constants import ChargerStates, RegisterAddresses
+from wallbox_modbus.wallbox_modbus import int16_to_uint16
+from simulator.simulator import FaultInjection, WallboxSimulator
+from conftest import set_server_values
+
+np = pytest.importorskip('numpy')
+
+pytestmark = pytest.mark.asyncio
+
+class TestFleetColumns:
+
+    fleet: WallboxFleet
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self):
+        self.fleet = WallboxFleet({
+            f'charger{i}': WallboxModbus(NULLMODEM_HOST) for i in range(3)
+        }, timeout=0.5)
+        self.fleet.wallboxes['unreachable'] = WallboxModbus(NULLMODEM_HOST, port=503)
+        yield
+        self.fleet.close()
+
+    async def test_snapshot_columns(self, fake_wallbox_modbus_server):
+        # Arrange
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.SERIAL_HIGH, [357, 60437])
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.AC_ACTIVE_POWER_RMS, [int16_to_uint16(-2345)])
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_STATE, [ChargerStates.DISCHARGING])
+        # Act
+        columns = await self.fleet.snapshot_columns()
+        # Assert
+        assert columns.registers.dtype == np.uint16
+        assert columns.valid.tolist() == [True, True, True, False]
+        assert list(columns.errors) == ['unreachable']
+        assert columns.column(RegisterAddresses.AC_ACTIVE_POWER_RMS).tolist() == [-2345, -2345, -2345, 0]
+        assert columns.column(RegisterAddresses.SERIAL_HIGH).tolist()[:3] == [23456789] * 3
+        assert columns.total(RegisterAddresses.AC_ACTIVE_POWER_RMS) == -3 * 2345
+        assert columns.state_counts()[ChargerStates.DISCHARGING] == 3
+        assert columns.state_counts()[ChargerStates.NO_CAR_CONNECTED] == 0
+        assert columns.charger_states().tolist()[:3] == ['discharging'] * 3
+
+    async def test_snapshot_columns_reuses_matrix(self, fake_wallbox_modbus_server):
+        # Arrange
+        first = await self.fleet.snapshot_columns()
+        # Act
+        second = await self.fleet.snapshot_columns(out=first.registers)
+        # Assert
+        assert second.registers is first.registers
+
+    async def test_exception_responses_mark_the_row_invalid(self, fake_wallbox_modbus_server):
+        # Arrange
+        simulator = WallboxSimulator(faults=FaultInjection(exception_rate=1.0))
+        await simulator.setup(NULLMODEM_HOST, 504)
+        task = asyncio.create_task(simulator.run())
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_STATE, [ChargerStates.CHARGING])
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.AC_ACTIVE_POWER_RMS, [100])
+        self.fleet.wallboxes['unreachable'] = WallboxModbus(NULLMODEM_HOST, port=504)
+        # Act
+        columns = await self.fleet.snapshot_columns()
+        # Assert
+        assert columns.valid.tolist() == [True, True, True, False]
+        assert isinstance(columns.errors['unreachable'], ModbusIOException)
+        assert columns.state_counts()[ChargerStates.CHARGING] == 3
+        assert columns.state_counts()[ChargerStates.NO_CAR_CONNECTED] == 0
+        assert columns.total(RegisterAddresses.AC_ACTIVE_POWER_RMS) == 300
+        await simulator.shutdown()
+        task.cancel()
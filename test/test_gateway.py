@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext, ModbusSequentialDataBlock
+from pymodbus.server import ModbusTcpServer
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus import ModbusGateway, ReconnectPolicy, WallboxFleet
+from wallbox_modbus.constants import RegisterAddresses
+from conftest import get_server_value, set_server_values
+
+pytestmark = pytest.mark.asyncio
+
+UNIT_IDS = [1, 2, 3]
+
+@pytest_asyncio.fixture
+async def fake_gateway_server():
+    slaves = {
+        unit_id: ModbusSlaveContext(hr=ModbusSequentialDataBlock(0x00, [0] * 547))
+        for unit_id in UNIT_IDS
+    }
+    context = ModbusServerContext(slaves=slaves, single=False)
+    server = ModbusTcpServer(context=context, address=(NULLMODEM_HOST, 502))
+    asyncio.create_task(server.serve_forever())
+    yield server
+    await server.shutdown()
+
+
+class TestModbusGateway:
+
+    gateway: ModbusGateway
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self):
+        self.gateway = ModbusGateway(NULLMODEM_HOST)
+        yield
+        self.gateway.close()
+
+    async def test_one_connection_for_all_units(self, fake_gateway_server):
+        # Arrange
+        wallboxes = [self.gateway.wallbox(unit_id) for unit_id in UNIT_IDS]
+        # Act
+        await self.gateway.connect()
+        for wallbox in wallboxes:
+            await wallbox.connect()
+        # Assert
+        assert len(fake_gateway_server.active_connections) == 1
+        assert all(wallbox.client is self.gateway.client for wallbox in wallboxes)
+
+    async def test_concurrent_requests_per_unit(self, fake_gateway_server):
+        # Arrange
+        for unit_id in UNIT_IDS:
+            set_server_values(fake_gateway_server, RegisterAddresses.STATE_OF_CHARGE, [unit_id * 10], unit_id)
+        await self.gateway.connect()
+        # Act
+        values = await asyncio.gather(*(
+            self.gateway.wallbox(unit_id).get_state_of_charge() for unit_id in UNIT_IDS
+        ))
+        # Assert
+        assert values == [10, 20, 30]
+
+    async def test_writes_go_to_one_unit(self, fake_gateway_server):
+        # Arrange
+        await self.gateway.connect()
+        # Act
+        await self.gateway.wallbox(2).set_current_setpoint(16)
+        # Assert
+        assert [get_server_value(fake_gateway_server, RegisterAddresses.CURRENT_SETPOINT, unit_id) for unit_id in UNIT_IDS] == [0, 16, 0]
+
+    async def test_fleet_snapshot_over_gateway(self, fake_gateway_server):
+        # Arrange
+        for unit_id in UNIT_IDS:
+            set_server_values(fake_gateway_server, RegisterAddresses.AC_VOLTAGE_RMS, [230 + unit_id], unit_id)
+        fleet = WallboxFleet({unit_id: self.gateway.wallbox(unit_id) for unit_id in UNIT_IDS})
+        await self.gateway.connect()
+        # Act
+        results = await fleet.snapshot_all()
+        # Assert
+        assert {unit_id: snapshot.ac_voltage_rms for unit_id, snapshot in results.values.items()} == {1: 231, 2: 232, 3: 233}
+        fleet.close()
+        assert self.gateway.client.connected
+
+    async def test_no_managed_connection_per_unit(self):
+        with pytest.raises(ValueError):
+            self.gateway.wallbox(1, reconnect=ReconnectPolicy())
+        with pytest.raises(ValueError):
+            self.gateway.wallbox(256)
+        assert self.gateway.wallboxes == {}
@@ -0,0 +1,36 @@
+from wallbox_modbus.metrics import (
+    READ_HOLDING_REGISTERS,
+    WRITE_SINGLE_REGISTER,
+    Transaction,
+    TransactionMetrics,
+    frame_sizes,
+)
+
+
+def test_frame_sizes():
+    assert frame_sizes(READ_HOLDING_REGISTERS, 27) == (12, 63)
+    assert frame_sizes(WRITE_SINGLE_REGISTER, 1) == (12, 12)
+
+def test_counts_per_function_code_and_block():
+    metrics = TransactionMetrics()
+    metrics.on_transaction(Transaction(READ_HOLDING_REGISTERS, 0x200, 27, 0.003, False, False))
+    metrics.on_transaction(Transaction(READ_HOLDING_REGISTERS, 0x200, 27, 0.02, True, False))
+    metrics.on_transaction(Transaction(READ_HOLDING_REGISTERS, 0x200, 27, 3.0, False, True))
+    metrics.on_transaction(Transaction(WRITE_SINGLE_REGISTER, 0x102, 1, 0.003, False, False))
+    series = metrics.series[(READ_HOLDING_REGISTERS, 0x200, 27)]
+    assert (series.count, series.errors, series.timeouts) == (3, 1, 1)
+    assert (series.bytes_sent, series.bytes_received) == (36, 63)
+    assert series.buckets[0] == 1
+    assert metrics.series[(WRITE_SINGLE_REGISTER, 0x102, 1)].count == 1
+
+def test_render_prometheus():
+    metrics = TransactionMetrics()
+    metrics.on_transaction(Transaction(READ_HOLDING_REGISTERS, 0x200, 27, 0.02, False, False))
+    text = metrics.render_prometheus({'charger': 'garage'})
+    labels = 'function_code="3",block="0x0200+27",charger="garage"'
+    assert '# TYPE wallbox_modbus_transactions_total counter' in text
+    assert f'wallbox_modbus_transactions_total{{{labels}}} 1' in text
+    assert f'wallbox_modbus_transaction_duration_seconds_bucket{{{labels},le="0.01"}} 0' in text
+    assert f'wallbox_modbus_transaction_duration_seconds_bucket{{{labels},le="0.025"}} 1' in text
+    assert f'wallbox_modbus_transaction_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f'wallbox_modbus_transaction_duration_seconds_count{{{labels}}} 1' in text
@@ -0,0 +1,95 @@
+import pytest
+import pytest_asyncio
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus.constants import ChargerStates, Control, RegisterAddresses
+from wallbox_modbus.poll_scheduler import DEFAULT_INTERVALS, PollScheduler
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+from conftest import FakeClock, set_server_values
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestPollScheduler:
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self, fake_wallbox_modbus_server):
+        self.server = fake_wallbox_modbus_server
+        self.clock = FakeClock()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST)
+        await self.wallbox.connect()
+        yield
+        self.wallbox.close()
+
+    async def test_first_tick_reads_all_fields(self):
+        # Arrange
+        set_server_values(self.server, RegisterAddresses.CONTROL, [Control.REMOTE])
+        set_server_values(self.server, RegisterAddresses.CHARGER_STATE, [ChargerStates.CHARGING, 42])
+        poller = PollScheduler(self.wallbox, clock=self.clock)
+
+        # Act
+        changes = await poller.tick()
+
+        # Assert
+        assert set(changes) == set(DEFAULT_INTERVALS)
+        assert poller.values[RegisterAddresses.CONTROL] == Control.REMOTE
+        assert poller.values[RegisterAddresses.STATE_OF_CHARGE] == 42
+        snapshot = poller.snapshot()
+        assert snapshot.charger_state == ChargerStates.CHARGING
+        assert snapshot.control == Control.REMOTE
+
+    async def test_only_due_fields_are_read(self):
+        # Arrange
+        poller = PollScheduler(self.wallbox, clock=self.clock)
+        await poller.tick()
+        set_server_values(self.server, RegisterAddresses.CONTROL, [Control.REMOTE])
+        set_server_values(self.server, RegisterAddresses.AC_ACTIVE_POWER_RMS, [3700])
+        reads, registers_read = poller.reads, poller.registers_read
+
+        # Act
+        self.clock.now = 1.0
+        changes = await poller.tick()
+
+        # Assert
+        assert changes == {RegisterAddresses.AC_ACTIVE_POWER_RMS: 3700}
+        assert poller.values[RegisterAddresses.CONTROL] == Control.USER
+        assert poller.reads - reads == 1
+        assert poller.registers_read - registers_read < 27
+
+    async def test_nothing_due(self):
+        poller = PollScheduler(self.wallbox, clock=self.clock)
+        await poller.tick()
+        reads = poller.reads
+        self.clock.now = 0.5
+        assert await poller.tick() == {}
+        assert poller.reads == reads
+        assert poller.next_due() == 1.0
+
+    async def test_invalidate_forces_refresh(self):
+        # Arrange
+        poller = PollScheduler(self.wallbox, {RegisterAddresses.CONTROL: None}, clock=self.clock)
+        await poller.tick()
+        set_server_values(self.server, RegisterAddresses.CONTROL, [Control.REMOTE])
+
+        # Act
+        poller.invalidate([RegisterAddresses.CONTROL])
+        changes = await poller.tick()
+
+        # Assert
+        assert changes == {RegisterAddresses.CONTROL: Control.REMOTE}
+        assert poller.next_due() is None
+
+    async def test_unread_fields_are_due_now(self):
+        poller = PollScheduler(self.wallbox, clock=self.clock)
+        self.clock.now = 3.0
+        assert poller.next_due() == 3.0
+        await poller.tick()
+        poller.invalidate([RegisterAddresses.FIRMWARE_VERSION])
+        assert poller.next_due() == 3.0
+
+    async def test_field_inside_another_field(self):
+        set_server_values(self.server, RegisterAddresses.SERIAL_HIGH, [357, 60437])
+        poller = PollScheduler(self.wallbox, {
+            RegisterAddresses.SERIAL_HIGH: None, RegisterAddresses.SERIAL_LOW: None,
+        }, clock=self.clock)
+        changes = await poller.tick()
+        assert changes == {RegisterAddresses.SERIAL_HIGH: 23456789, RegisterAddresses.SERIAL_LOW: 60437}
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus.constants import Control, RegisterAddresses
+from wallbox_modbus.proxy import WallboxProxy
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+from conftest import get_server_value, set_server_values
+
+pytestmark = pytest.mark.asyncio
+
+PROXY_PORT = 5020
+
+
+class TestWallboxProxy:
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self, fake_wallbox_modbus_server):
+        self.server = fake_wallbox_modbus_server
+        set_server_values(self.server, RegisterAddresses.STATE_OF_CHARGE, [42])
+        self.proxy = WallboxProxy(WallboxModbus(NULLMODEM_HOST), NULLMODEM_HOST, PROXY_PORT, poll_interval=10)
+        task = asyncio.create_task(self.proxy.run())
+        await asyncio.sleep(0.05)
+        self.clients = [AsyncModbusTcpClient(NULLMODEM_HOST, port=PROXY_PORT) for _ in range(3)]
+        for client in self.clients:
+            await client.connect()
+        yield
+        for client in self.clients:
+            client.close()
+        await self.proxy.shutdown()
+        task.cancel()
+        self.proxy.wallbox.close()
+
+    async def test_reads_are_served_from_the_cache(self):
+        # Arrange
+        upstream_reads = self.proxy.upstream_reads
+
+        # Act
+        results = await asyncio.gather(*[
+            client.read_holding_registers(RegisterAddresses.CHARGER_STATE, 2) for client in self.clients
+        ])
+
+        # Assert
+        assert [result.registers for result in results] == [[0, 42]] * 3
+        assert self.proxy.upstream_reads == upstream_reads
+
+    async def test_uncached_range_is_read_upstream_once(self):
+        # Arrange
+        upstream_reads = self.proxy.upstream_reads
+
+        # Act
+        results = await asyncio.gather(*[client.read_holding_registers(0x50, 1) for client in self.clients])
+
+        # Assert
+        assert all(not result.isError() for result in results)
+        assert self.proxy.upstream_reads == upstream_reads + 1
+
+    async def test_writes_are_passed_through(self):
+        # Act
+        result = await self.clients[0].write_register(RegisterAddresses.CONTROL, Control.REMOTE)
+        await self.clients[1].write_registers(RegisterAddresses.CURRENT_SETPOINT, [16, 0, 3700])
+        read = await self.clients[2].read_holding_registers(RegisterAddresses.CONTROL, 1)
+
+        # Assert
+        assert not result.isError()
+        assert get_server_value(self.server, RegisterAddresses.CONTROL) == Control.REMOTE
+        assert get_server_value(self.server, RegisterAddresses.POWER_SETPOINT) == 3700
+        assert read.registers == [Control.REMOTE]
+        assert self.proxy.upstream_writes == 2
@@ -0,0 +1,44 @@
+from wallbox_modbus.constants import RegisterAddresses
+from wallbox_modbus.read_planner import MAX_READ_COUNT, plan_reads
+from wallbox_modbus.wallbox_modbus import to_write_groups
+
+
+def test_single_address():
+    assert plan_reads([RegisterAddresses.CONTROL]) == ((0x51, 1),)
+
+def test_adjacent_addresses_are_merged():
+    plan = plan_reads([RegisterAddresses.SETPOINT_TYPE, RegisterAddresses.CONTROL, RegisterAddresses.AUTO_CHARGING_DISCHARGING])
+    assert plan == ((0x51, 3),)
+
+def test_small_gaps_are_read_through():
+    plan = plan_reads([RegisterAddresses.AC_CURRENT_RMS, RegisterAddresses.AC_ACTIVE_POWER_RMS])
+    assert plan == ((0x207, 8),)
+
+def test_large_gaps_are_split():
+    plan = plan_reads([RegisterAddresses.CONTROL, RegisterAddresses.CURRENT_SETPOINT])
+    assert plan == ((0x51, 1), (0x102, 1))
+
+def test_all_registers():
+    plan = plan_reads(list(RegisterAddresses))
+    assert plan == ((0x1, 9), (0x51, 3), (0x100, 5), (0x200, 27))
+
+def test_max_read_count_is_respected():
+    plan = plan_reads(range(0, 300), request_cost=1000)
+    assert all(count <= MAX_READ_COUNT for _, count in plan)
+    assert sum(count for _, count in plan) == 300
+    assert len(plan) == 3
+
+def test_plans_are_cached():
+    fields = [RegisterAddresses.AC_VOLTAGE_RMS, RegisterAddresses.CHARGER_STATE]
+    assert plan_reads(fields) is plan_reads(list(reversed(fields)))
+
+def test_write_groups():
+    groups = to_write_groups({
+        RegisterAddresses.SETPOINT_TYPE: 1,
+        RegisterAddresses.CONTROL: 1,
+        RegisterAddresses.CHARGER_LOCK_STATE: 0,
+        RegisterAddresses.CURRENT_SETPOINT: 16,
+        RegisterAddresses.POWER_SETPOINT: 3700,
+    })
+    # 0x52 is not reserved and 0x101 is the action register, so neither is bridged
+    assert groups == [(0x51, [1]), (0x53, [1]), (0x100, [0]), (0x102, [16, 0, 3700])]
@@ -0,0 +1,88 @@
+import pytest
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus import SnapshotRecorder, SnapshotRecording, WallboxModbus
+from wallbox_modbus.constants import SNAPSHOT_WIDTH, RegisterAddresses
+from wallbox_modbus.recorder import HEADER, RECORD
+from conftest import set_server_values
+
+
+def blocks_for(value):
+    return ([value] * 9, [value] * 3, [value] * 5, [value] * 27)
+
+
+def test_append_and_read(tmp_path):
+    path = tmp_path / 'charger.rec'
+    recorder = SnapshotRecorder(path, capacity=4)
+    recorder.append(1.0, blocks_for(1))
+    recorder.append(2.0, blocks_for(2))
+    recording = SnapshotRecording(path)
+    records = list(recording.records())
+    assert [timestamp for timestamp, _ in records] == [1.0, 2.0]
+    assert records[1][1] == (2,) * SNAPSHOT_WIDTH
+    recording.close()
+    recorder.close()
+
+def test_wrap_around(tmp_path):
+    path = tmp_path / 'charger.rec'
+    recorder = SnapshotRecorder(path, capacity=3)
+    for i in range(5):
+        recorder.append(float(i), blocks_for(i))
+    recording = SnapshotRecording(path)
+    assert len(recording) == 2
+    assert [timestamp for timestamp, _ in recording.records()] == [3.0, 4.0]
+    assert [timestamp for timestamp, _ in recording.records(3.0, 4.0)] == [3.0]
+    assert path.stat().st_size == HEADER.size + 3 * (8 + 2 * SNAPSHOT_WIDTH)
+    recording.close()
+    recorder.close()
+
+def test_slot_being_written_is_skipped(tmp_path):
+    path = tmp_path / 'charger.rec'
+    recorder = SnapshotRecorder(path, capacity=3)
+    for i in range(4):
+        recorder.append(float(i), blocks_for(i))
+    recording = SnapshotRecording(path)
+    # a partial write of the next record, over the oldest one
+    RECORD.pack_into(recorder._mmap, HEADER.size + RECORD.size, 99.0, *[0] * SNAPSHOT_WIDTH)
+    assert [timestamp for timestamp, _ in recording.records()] == [2.0, 3.0]
+    recording.close()
+    recorder.close()
+
+def test_reopen_continues(tmp_path):
+    path = tmp_path / 'charger.rec'
+    recorder = SnapshotRecorder(path, capacity=3)
+    recorder.append(1.0, blocks_for(1))
+    recorder.close()
+    recorder = SnapshotRecorder(path)
+    recorder.append(2.0, blocks_for(2))
+    recorder.close()
+    recording = SnapshotRecording(path)
+    assert [timestamp for timestamp, _ in recording.records()] == [1.0, 2.0]
+    recording.close()
+
+def test_between(tmp_path):
+    pytest.importorskip('numpy')
+    path = tmp_path / 'charger.rec'
+    recorder = SnapshotRecorder(path, capacity=4)
+    for i in range(6):
+        recorder.append(float(i), blocks_for(i))
+    recording = SnapshotRecording(path)
+    records = recording.between(3.0, 10.0)
+    assert records['timestamp'].tolist() == [3.0, 4.0, 5.0]
+    assert records['registers'][:, 0].tolist() == [3, 4, 5]
+    del records
+    recorder.close()
+
+@pytest.mark.asyncio
+async def test_record(tmp_path, fake_wallbox_modbus_server):
+    wallbox = WallboxModbus(NULLMODEM_HOST)
+    await wallbox.connect()
+    set_server_values(fake_wallbox_modbus_server, RegisterAddresses.STATE_OF_CHARGE, [23])
+    recorder = SnapshotRecorder(tmp_path / 'charger.rec', capacity=10)
+    snapshot = await recorder.record(wallbox)
+    recorder.close()
+    wallbox.close()
+    recording = SnapshotRecording(tmp_path / 'charger.rec')
+    (_, registers), = recording.records()
+    assert snapshot.state_of_charge == 23
+    assert registers[-1] == 23
+    recording.close()
@@ -0,0 +1,44 @@
+from wallbox_modbus.constants import RegisterAddresses, RegisterClass
+from wallbox_modbus.register_cache import RegisterCache
+from conftest import FakeClock
+
+
+def test_miss_then_hit():
+    cache = RegisterCache()
+    assert cache.get(RegisterAddresses.CONTROL) is None
+    cache.put(RegisterAddresses.CONTROL, [1, 0, 1])
+    assert cache.get(RegisterAddresses.CONTROL, 3) == [1, 0, 1]
+    assert cache.get(RegisterAddresses.SETPOINT_TYPE) == [1]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_partial_range_is_a_miss():
+    cache = RegisterCache()
+    cache.put(RegisterAddresses.CONTROL, [1, 0])
+    assert cache.get(RegisterAddresses.CONTROL, 3) is None
+
+def test_ttl_per_register_class():
+    clock = FakeClock()
+    cache = RegisterCache(ttls={RegisterClass.MEASUREMENT: 1.0, RegisterClass.CONTROL: 5.0}, clock=clock)
+    cache.put(RegisterAddresses.AC_CURRENT_RMS, [23])
+    cache.put(RegisterAddresses.CURRENT_SETPOINT, [16])
+    cache.put(RegisterAddresses.FIRMWARE_VERSION, [3400])
+    clock.now = 2.0
+    assert cache.get(RegisterAddresses.AC_CURRENT_RMS) is None
+    assert cache.get(RegisterAddresses.CURRENT_SETPOINT) == [16]
+    clock.now = 1e9
+    assert cache.get(RegisterAddresses.FIRMWARE_VERSION) == [3400]
+
+def test_invalidate_control_resets_configuration():
+    cache = RegisterCache()
+    cache.put(RegisterAddresses.CONTROL, [1, 0, 1])
+    cache.invalidate(RegisterAddresses.CONTROL)
+    assert cache.get(RegisterAddresses.CONTROL) is None
+    assert cache.get(RegisterAddresses.SETPOINT_TYPE) is None
+
+def test_invalidate_action_resets_charger_state():
+    cache = RegisterCache()
+    cache.put(RegisterAddresses.CHARGER_STATE, [4, 55])
+    cache.put(RegisterAddresses.FIRMWARE_VERSION, [3400])
+    cache.invalidate(RegisterAddresses.ACTION)
+    assert cache.get(RegisterAddresses.CHARGER_STATE) is None
+    assert cache.get(RegisterAddresses.FIRMWARE_VERSION) == [3400]
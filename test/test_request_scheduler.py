@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus.constants import RegisterAddresses
+from wallbox_modbus.metrics import READ_HOLDING_REGISTERS, WRITE_SINGLE_REGISTER
+from wallbox_modbus.request_scheduler import (
+    RequestDroppedError,
+    RequestPriority,
+    RequestScheduler,
+    request_deadline,
+    request_priority,
+)
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+
+pytestmark = pytest.mark.asyncio
+
+
+async def run_in_order(scheduler, started, priority, name):
+    async with scheduler.slot(priority):
+        started.append(name)
+        await asyncio.sleep(0)
+
+
+async def test_request_priority():
+    assert request_priority(WRITE_SINGLE_REGISTER, [(RegisterAddresses.ACTION, 1)]) == RequestPriority.SAFETY
+    assert request_priority(WRITE_SINGLE_REGISTER, [(RegisterAddresses.CURRENT_SETPOINT, 1)]) == RequestPriority.SETPOINT
+    assert request_priority(READ_HOLDING_REGISTERS, [(RegisterAddresses.FIRMWARE_VERSION, 9)]) == RequestPriority.IDENTITY
+    assert request_priority(READ_HOLDING_REGISTERS, [(0x1, 9), (0x200, 27)]) == RequestPriority.STATE
+
+async def test_waiting_requests_start_in_priority_order():
+    scheduler = RequestScheduler()
+    started = []
+    await scheduler.acquire(RequestPriority.STATE)
+    tasks = [
+        asyncio.create_task(run_in_order(scheduler, started, priority, name))
+        for priority, name in [
+            (RequestPriority.IDENTITY, 'identity'),
+            (RequestPriority.STATE, 'state'),
+            (RequestPriority.SETPOINT, 'setpoint'),
+            (RequestPriority.SAFETY, 'stop'),
+        ]
+    ]
+    await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    assert started == ['stop', 'setpoint', 'state', 'identity']
+    assert scheduler.in_flight == 0
+
+async def test_overload_drops_oldest_least_urgent_read():
+    scheduler = RequestScheduler(max_queued=2)
+    await scheduler.acquire(RequestPriority.STATE)
+    old_poll = asyncio.create_task(scheduler.acquire(RequestPriority.STATE))
+    new_poll = asyncio.create_task(scheduler.acquire(RequestPriority.STATE))
+    await asyncio.sleep(0)
+    write = asyncio.create_task(scheduler.acquire(RequestPriority.SETPOINT))
+    await asyncio.sleep(0)
+    with pytest.raises(RequestDroppedError):
+        await old_poll
+    scheduler.release()
+    await write
+    assert not new_poll.done()
+    scheduler.release()
+    await new_poll
+    assert scheduler.dropped == 1
+
+async def test_writes_are_not_dropped_for_overload():
+    scheduler = RequestScheduler(max_queued=1)
+    await scheduler.acquire(RequestPriority.STATE)
+    writes = [asyncio.create_task(scheduler.acquire(RequestPriority.SETPOINT)) for _ in range(3)]
+    await asyncio.sleep(0)
+    for write in writes:
+        scheduler.release()
+        await write
+    assert scheduler.dropped == 0
+
+async def test_request_dropped_after_deadline():
+    scheduler = RequestScheduler(deadlines={RequestPriority.STATE: 0.01})
+    await scheduler.acquire(RequestPriority.SAFETY)
+    with pytest.raises(RequestDroppedError):
+        await scheduler.acquire(RequestPriority.STATE)
+    with pytest.raises(RequestDroppedError):
+        with request_deadline(0.01):
+            await scheduler.acquire(RequestPriority.SETPOINT)
+    scheduler.release()
+    assert (scheduler.in_flight, scheduler.queued, scheduler.dropped) == (0, 0, 2)
+
+async def test_cancelled_request_leaves_the_queue():
+    scheduler = RequestScheduler()
+    await scheduler.acquire(RequestPriority.STATE)
+    waiting = asyncio.create_task(scheduler.acquire(RequestPriority.STATE))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    scheduler.release()
+    assert (scheduler.in_flight, scheduler.queued) == (0, 0)
+
+
+class TestScheduledWallbox:
+
+    async def test_stop_overtakes_queued_polls(self, fake_wallbox_modbus_server):
+        # Arrange
+        scheduler = RequestScheduler()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, request_scheduler=scheduler)
+        await self.wallbox.connect()
+        order = []
+
+        async def poll():
+            await self.wallbox.get_all_values()
+            order.append('poll')
+
+        async def stop():
+            await self.wallbox.stop_charging_discharging()
+            order.append('stop')
+
+        # Act
+        polls = [asyncio.create_task(poll()) for _ in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.gather(stop(), *polls)
+
+        # Assert
+        assert order.index('stop') <= 1
+        assert scheduler.in_flight == 0
+        self.wallbox.close()
@@ -0,0 +1,289 @@
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from pymodbus.pdu import ModbusExceptions
+from pymodbus.register_read_message import ReadHoldingRegistersRequest
+from pymodbus.register_write_message import WriteMultipleRegistersRequest, WriteSingleRegisterRequest
+from pymodbus.transport import NULLMODEM_HOST
+from simulator.simulator import (
+    CHARGING,
+    CONNECTED_WAITING_FOR_CAR_DEMAND,
+    DISCHARGING,
+    FaultInjection,
+    SimulatedCharger,
+    WallboxSimulator,
+    to_int16,
+    uniform_latency,
+)
+
+CURRENT = 0
+POWER_BY_PHASE = 1
+SIMULATOR_PORT = 5030
+
+
+def charging(setpoint_type, current_setpoint=0, power_setpoint=0, soc=0.5):
+    charger = SimulatedCharger(battery_capacity=60000)
+    charger.energy = soc * charger.battery_capacity
+    charger._set_modbus_values(0x53, [setpoint_type])
+    charger._set_modbus_values(0x102, [current_setpoint & 0xffff, 0, power_setpoint & 0xffff])
+    charger._set_modbus_values(0x219, [CHARGING])
+    return charger
+
+def measurements(charger):
+    # (current, power, charger status, state of charge)
+    current = to_int16(charger._get_modbus_values(0x207, 1)[0])
+    power = to_int16(charger._get_modbus_values(0x20e, 1)[0])
+    state, soc = charger._get_modbus_values(0x219, 2)
+    return current, power, state, soc
+
+
+def test_current_setpoint():
+    charger = charging(CURRENT, current_setpoint=16)
+    charger.advance(1)
+    assert measurements(charger) == (16, 16 * 230, CHARGING, 50)
+
+def test_power_setpoint():
+    charger = charging(POWER_BY_PHASE, power_setpoint=2300)
+    charger.advance(1)
+    assert measurements(charger) == (10, 2300, CHARGING, 50)
+
+def test_negative_setpoint_discharges():
+    charger = charging(POWER_BY_PHASE, power_setpoint=-4600)
+    charger.advance(1)
+    assert measurements(charger) == (-20, -4600, DISCHARGING, 50)
+
+def test_setpoints_are_clamped_to_max_available():
+    # max available current is 25 A and max available power 5750 W
+    charger = charging(CURRENT, current_setpoint=32)
+    charger.advance(1)
+    assert measurements(charger)[:2] == (25, 25 * 230)
+    charger = charging(POWER_BY_PHASE, power_setpoint=-7400)
+    charger.advance(1)
+    assert measurements(charger)[:2] == (-25, -5750)
+
+def test_state_of_charge_integrates_power():
+    charger = charging(POWER_BY_PHASE, power_setpoint=3000)
+    for _ in range(60):
+        charger.advance(60)
+    assert charger.energy == pytest.approx(33000)
+    assert measurements(charger)[3] == 55
+
+def test_full_battery_stops_charging():
+    charger = charging(POWER_BY_PHASE, power_setpoint=5750, soc=0.99)
+    charger.advance(3600)
+    assert charger.energy == charger.battery_capacity
+    assert measurements(charger) == (0, 0, CONNECTED_WAITING_FOR_CAR_DEMAND, 100)
+    charger.advance(3600)
+    assert measurements(charger) == (0, 0, CONNECTED_WAITING_FOR_CAR_DEMAND, 100)
+
+def test_empty_battery_stops_discharging():
+    charger = charging(POWER_BY_PHASE, power_setpoint=-5750, soc=0.01)
+    charger.advance(3600)
+    assert charger.energy == 0
+    assert measurements(charger) == (0, 0, CONNECTED_WAITING_FOR_CAR_DEMAND, 0)
+
+def test_idle_charger_does_not_change():
+    charger = SimulatedCharger()
+    before = measurements(charger), charger.energy
+    charger.advance(3600)
+    assert (measurements(charger), charger.energy) == before
+
+def test_simulator_advances_in_time_steps():
+    simulator = WallboxSimulator(time_step=10.0)
+    simulator.chargers.append(charging(POWER_BY_PHASE, power_setpoint=3600))
+    simulator.advance(100)
+    assert simulator.time == 100.0
+    assert simulator.chargers[0].energy == pytest.approx(30000 + 100)
+
+
+def recording_handlers(charger):
+    # replaces the write handlers of charger, returns the (address, value) they get
+    calls = []
+    for address in charger._write_handlers:
+        charger._write_handlers[address] = lambda address, value: calls.append((address, value))
+    return calls
+
+def test_write_spanning_both_handlers():
+    charger = SimulatedCharger()
+    values = list(charger._get_modbus_values(0x51, 0x102 - 0x51))
+    values[0] = 0   # control: user
+    values[-1] = 1  # action: start
+    charger.process_write_registers(0x51, values)
+    assert charger._get_modbus_values(0x53, 1) == [0]
+    assert charger._get_modbus_values(0x219, 1) == [CHARGING]
+
+def test_writes_reach_only_the_handlers_in_range():
+    charger = SimulatedCharger()
+    calls = recording_handlers(charger)
+    charger.process_write_registers(0x4f, [1, 1])      # ends just before control
+    charger.process_write_registers(0x52, [1] * 0xaf)  # between control and action
+    charger.process_write_registers(0x102, [16])       # after action
+    assert calls == []
+    charger.process_write_registers(0x50, [0, 0])
+    charger.process_write_registers(0x100, [0, 2, 0])
+    assert calls == [(0x51, 0), (0x101, 2)]
+
+def test_unchanged_value_is_not_handled():
+    charger = SimulatedCharger()
+    calls = recording_handlers(charger)
+    charger.process_write_registers(0x51, [1])  # control is already remote
+    assert calls == []
+
+def test_trace_is_off_by_default():
+    simulator = WallboxSimulator()
+    simulator._server_request_tracer({}, ReadHoldingRegistersRequest(0x1, 9))
+    assert simulator.trace is None
+
+def test_trace_keeps_the_latest_requests():
+    simulator = WallboxSimulator(trace=2)
+    charger = SimulatedCharger()
+    requests = [
+        ReadHoldingRegistersRequest(0x1, 9),
+        WriteSingleRegisterRequest(0x101, 1),
+        WriteMultipleRegistersRequest(0x102, [16, 0]),
+    ]
+    for request in requests:
+        simulator._server_request_tracer({None: charger}, request)
+    assert [request for _, request in simulator.trace] == requests[1:]
+    assert charger._get_modbus_values(0x219, 1) == [CHARGING]
+
+def test_fault_sequence_is_seeded():
+    def sequence():
+        faults = FaultInjection(uniform_latency(0.01, 0.1), drop_rate=0.2, reset_rate=0.1, exception_rate=0.2, seed=7)
+        return [faults.decide(0x3) for _ in range(50)], (faults.dropped, faults.resets, faults.exceptions)
+
+    decisions, counts = sequence()
+    assert sequence() == (decisions, counts)
+    assert {fault for _, fault in decisions} == {None, 'drop', 'reset', 'exception'}
+    assert all(0.01 <= delay <= 0.1 for delay, _ in decisions)
+    assert counts == tuple(sum(fault == name for _, fault in decisions) for name in ('drop', 'reset', 'exception'))
+
+def test_function_code_delays():
+    faults = FaultInjection(delays={0x10: 0.5}, seed=1)
+    assert faults.decide(0x3) == (0.0, None)
+    assert faults.decide(0x10) == (0.5, None)
+
+
+@pytest.mark.asyncio
+class TestFaultInjection:
+
+    async def start(self, faults):
+        self.simulator = WallboxSimulator(faults=faults)
+        await self.simulator.setup(NULLMODEM_HOST, SIMULATOR_PORT)
+        self.task = asyncio.create_task(self.simulator.run())
+        await asyncio.sleep(0)
+        self.client = AsyncModbusTcpClient(NULLMODEM_HOST, port=SIMULATOR_PORT, timeout=0.1, retries=0)
+        await self.client.connect()
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self):
+        yield
+        self.client.close()
+        await self.simulator.shutdown()
+        self.task.cancel()
+
+    async def test_seeded_faults_reach_the_client(self):
+        # Arrange
+        await self.start(FaultInjection(uniform_latency(0.0, 0.01), exception_rate=0.5, seed=3))
+        expected = FaultInjection(uniform_latency(0.0, 0.01), exception_rate=0.5, seed=3)
+
+        # Act
+        results = [await self.client.read_holding_registers(0x1, 1, slave=1) for _ in range(20)]
+
+        # Assert
+        for result in results:
+            _, fault = expected.decide(0x3)
+            if fault == 'exception':
+                assert result.isError()
+                assert result.exception_code == ModbusExceptions.SlaveBusy
+            else:
+                assert result.registers == [3400]
+        assert 0 < self.simulator.faults.exceptions < 20
+        assert self.simulator.faults.exceptions == expected.exceptions
+
+    async def test_latency(self):
+        await self.start(FaultInjection(delays={0x3: 0.05}))
+        start = time.monotonic()
+        result = await self.client.read_holding_registers(0x1, 1, slave=1)
+        assert result.registers == [3400]
+        assert time.monotonic() - start >= 0.05
+
+    async def test_dropped_request_times_out(self):
+        await self.start(FaultInjection(drop_rate=1.0))
+        with pytest.raises(ModbusIOException):
+            await self.client.read_holding_registers(0x1, 1, slave=1)
+        assert self.simulator.faults.dropped == 1
+
+    async def test_reset_closes_the_connection(self):
+        await self.start(FaultInjection(reset_rate=1.0))
+        with pytest.raises((ConnectionException, ModbusIOException)):
+            await self.client.read_holding_registers(0x1, 1, slave=1)
+        assert self.simulator.faults.resets == 1
+        assert not self.client.connected
+
+
+@pytest.mark.asyncio
+class TestScaleModes:
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self):
+        self.simulator = WallboxSimulator()
+        self.clients = []
+        yield
+        for client in self.clients:
+            client.close()
+        await self.simulator.shutdown()
+        self.task.cancel()
+
+    async def start(self, chargers, port_range):
+        await self.simulator.setup(NULLMODEM_HOST, SIMULATOR_PORT, chargers, port_range)
+        self.task = asyncio.create_task(self.simulator.run())
+        await asyncio.sleep(0)
+
+    async def connect(self, port):
+        client = AsyncModbusTcpClient(NULLMODEM_HOST, port=port, timeout=0.1, retries=0)
+        await client.connect()
+        self.clients.append(client)
+        return client
+
+    async def test_chargers_as_unit_ids(self):
+        # Arrange
+        await self.start(3, port_range=False)
+        client = await self.connect(SIMULATOR_PORT)
+
+        # Act
+        serials = [(await client.read_holding_registers(0x2, 2, slave=unit_id)).registers for unit_id in (1, 2, 3)]
+        await client.write_register(0x101, 1, slave=2)
+
+        # Assert
+        assert len(self.simulator.servers) == 1
+        assert serials == [[5, 19659], [5, 19660], [5, 19661]]
+        states = [charger._get_modbus_values(0x219, 1)[0] for charger in self.simulator.chargers]
+        assert states == [4, CHARGING, 4]
+
+    async def test_chargers_on_a_port_range(self):
+        # Arrange
+        await self.start(3, port_range=True)
+        clients = [await self.connect(SIMULATOR_PORT + index) for index in range(3)]
+
+        # Act
+        serials = [(await client.read_holding_registers(0x2, 2, slave=1)).registers for client in clients]
+        await clients[2].write_register(0x101, 1, slave=1)
+
+        # Assert
+        assert len(self.simulator.servers) == 3
+        assert serials == [[5, 19659], [5, 19660], [5, 19661]]
+        states = [charger._get_modbus_values(0x219, 1)[0] for charger in self.simulator.chargers]
+        assert states == [4, 4, CHARGING]
+
+    async def test_too_many_chargers_for_unit_ids(self):
+        with pytest.raises(ValueError):
+            await self.simulator.setup(NULLMODEM_HOST, SIMULATOR_PORT, 248)
+        await self.start(300, port_range=True)
+        client = await self.connect(SIMULATOR_PORT + 299)
+        result = await client.read_holding_registers(0x2, 2, slave=1)
+        assert len(self.simulator.servers) == 300
+        assert result.registers == [5, 19659 + 299]
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from pymodbus.transport import NULLMODEM_HOST
+from wallbox_modbus import WallboxFleet, WallboxModbus
+from wallbox_modbus.constants import RegisterAddresses
+from conftest import set_server_values
+
+pytestmark = pytest.mark.asyncio
+
+class TestWallboxFleet:
+
+    fleet: WallboxFleet
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def _setup_teardown(self):
+        self.fleet = WallboxFleet({
+            f'charger{i}': WallboxModbus(NULLMODEM_HOST) for i in range(3)
+        }, max_concurrency=2, timeout=0.5)
+        yield
+        self.fleet.close()
+
+    async def test_connect_all(self, fake_wallbox_modbus_server):
+        # Act
+        results = await self.fleet.connect_all()
+        # Assert
+        assert results.errors == {}
+        assert len(fake_wallbox_modbus_server.active_connections) == 3
+
+    async def test_snapshot_all(self, fake_wallbox_modbus_server):
+        # Arrange
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.STATE_OF_CHARGE, [23])
+        # Act
+        results = await self.fleet.snapshot_all()
+        # Assert
+        assert results.errors == {}
+        assert sorted(results.values) == ['charger0', 'charger1', 'charger2']
+        assert all(snapshot.state_of_charge == 23 for snapshot in results.values.values())
+
+    async def test_broadcast(self, fake_wallbox_modbus_server):
+        # Act
+        await self.fleet.broadcast('set_current_setpoint', -16)
+        results = await self.fleet.broadcast('get_current_setpoint')
+        # Assert
+        assert results.values == {'charger0': -16, 'charger1': -16, 'charger2': -16}
+
+    async def test_call(self, fake_wallbox_modbus_server):
+        # Arrange
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.AC_VOLTAGE_RMS, [234])
+        # Act
+        value = await self.fleet.call('charger1', 'get_ac_voltage_rms')
+        # Assert
+        assert value == 234
+
+    async def test_partial_results_on_stalled_charger(self, fake_wallbox_modbus_server):
+        # Arrange
+        async def stalled():
+            await asyncio.sleep(10)
+        self.fleet['charger1'].get_snapshot = stalled
+        # Act
+        results = await self.fleet.snapshot_all()
+        # Assert
+        assert sorted(results.values) == ['charger0', 'charger2']
+        assert isinstance(results.errors['charger1'], asyncio.TimeoutError)
+
+    async def test_partial_results_on_unreachable_charger(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.fleet.wallboxes['unreachable'] = WallboxModbus(NULLMODEM_HOST, port=503)
+        # Act
+        results = await self.fleet.snapshot_all()
+        # Assert
+        assert sorted(results.values) == ['charger0', 'charger1', 'charger2']
+        assert list(results.errors) == ['unreachable']
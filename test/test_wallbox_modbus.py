@@ -1,7 +1,17 @@
+import asyncio
 import pytest
 import pytest_asyncio
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from pymodbus.pdu import ExceptionResponse, ModbusExceptions
 from pymodbus.transport import NULLMODEM_HOST
-from wallbox_modbus import WallboxModbus
+from wallbox_modbus import (
+    CircuitOpenError,
+    ReconnectPolicy,
+    RegisterCache,
+    TransactionMetrics,
+    WallboxModbus,
+    WriteScheduler,
+)
 from wallbox_modbus.wallbox_modbus import (
     int16_to_uint16,
     uint16_to_int16,
@@ -15,6 +25,7 @@ from wallbox_modbus.constants import (
     RegisterAddresses,
     SetpointType,
 )
+from conftest import get_server_value, set_server_values
 
 pytestmark = pytest.mark.asyncio
 
@@ -39,9 +50,10 @@ class TestWallboxModbus:
 
     # Firmware version
 
-    async def test_get_firmware_version(self, fake_wallbox_modbus_server, connect_to_wallbox):
+    async def test_get_firmware_version(self, fake_wallbox_modbus_server):
         # Arrange
         set_server_values(fake_wallbox_modbus_server, RegisterAddresses.FIRMWARE_VERSION, [2345])
+        await self.wallbox.connect()
         # Act
         value = await self.wallbox.get_firmware_version()
         # Assert
@@ -49,9 +61,10 @@ class TestWallboxModbus:
 
     # Serial number
 
-    async def test_get_serial_number(self, fake_wallbox_modbus_server, connect_to_wallbox):
+    async def test_get_serial_number(self, fake_wallbox_modbus_server):
         # Arrange
         set_server_values(fake_wallbox_modbus_server, RegisterAddresses.SERIAL_HIGH, [357, 60437])
+        await self.wallbox.connect()
         # Act
         value = await self.wallbox.get_serial_number()
         # Assert
@@ -59,14 +72,40 @@ class TestWallboxModbus:
 
     # Part number
 
-    async def test_get_part_number(self, fake_wallbox_modbus_server, connect_to_wallbox):
+    async def test_get_part_number(self, fake_wallbox_modbus_server):
         # Arrange
         set_server_values(fake_wallbox_modbus_server, RegisterAddresses.PART_NUMBER_1, [(33<<8)+34, (35<<8)+36, (37<<8)+38, (39<<8)+40, (41<<8)+42, (43<<8)+44])
+        await self.wallbox.connect()
         # Act
         value = await self.wallbox.get_part_number()
         # Assert
         assert value == '!"#$-%-&-\'-(-)*+-,'
 
+    # Identity
+
+    async def test_identity_is_read_once_per_connection(self, fake_wallbox_modbus_server):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.connect()
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.FIRMWARE_VERSION, [3456])
+        # Act
+        value = await self.wallbox.get_firmware_version()
+        data = await self.wallbox.get_all_values()
+        # Assert
+        assert value == 2345
+        assert data.get('firmware_version') == 2345
+
+    async def test_identity_is_cleared_after_reboot(self, fake_wallbox_modbus_server):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.connect()
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.FIRMWARE_VERSION, [3456])
+        # Act
+        await self.wallbox.reboot_charger()
+        value = await self.wallbox.get_firmware_version()
+        # Assert
+        assert value == 3456
+
     # Control
 
     async def test_release_control(self, fake_wallbox_modbus_server, connect_to_wallbox):
@@ -283,79 +322,425 @@ class TestWallboxModbus:
 
     # All data
 
-    async def test_get_all_values(self, fake_wallbox_modbus_server, connect_to_wallbox):
-        # Arrange
-        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.FIRMWARE_VERSION, [
-            2345, # Firmware version
-            357, # S/N high
-            60437, # S/N low
-            (33<<8)+34, # P/N
-            (35<<8)+36,
-            (37<<8)+38,
-            (39<<8)+40,
-            (41<<8)+42,
-            (43<<8)+44,
-        ])
-        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CONTROL, [
-            Control.REMOTE,
-            AutoChargingDischarging.ENABLE,
-            SetpointType.POWER,
-        ])
-        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_LOCK_STATE, [
-            ChargerLockState.LOCK,
-            0, # Action - ignored
-            int16_to_uint16(-23), # current setpoint
-            0, # reserved
-            int16_to_uint16(-2345), # power setpoint
+    async def test_get_all_values(self, fake_wallbox_modbus_server):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.connect()
+        # Act
+        data = await self.wallbox.get_all_values()
+        # Assert
+        assert_all_values(data)
+
+    async def test_get_all_values_action_is_int(self, fake_wallbox_modbus_server):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.ACTION, [Action.STOP_CHARGING_DISCHARGING])
+        await self.wallbox.connect()
+        # Act
+        data = await self.wallbox.get_all_values()
+        # Assert
+        assert data.get('action') == 2
+        assert type(data.get('action')) is int
+
+    async def test_get_all_values_not_pipelined(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, pipelined=False)
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.connect()
+        # Act
+        data = await self.wallbox.get_all_values()
+        # Assert
+        assert_all_values(data)
+
+    async def test_read_blocks_pipelined(self, fake_wallbox_modbus_server, connect_to_wallbox):
+        # Arrange
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CONTROL, [1, 2, 3])
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.MAX_AVAILABLE_CURRENT, [4, 5, 6])
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_LOCK_STATE, [7, 8])
+        # Act
+        results = await self.wallbox._read_blocks([
+            (RegisterAddresses.MAX_AVAILABLE_CURRENT, 3),
+            (RegisterAddresses.CONTROL, 3),
+            (RegisterAddresses.CHARGER_LOCK_STATE, 2),
         ])
-        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.MAX_AVAILABLE_CURRENT, [
-            23, # max available current
-            0, # reserved,
-            2345, # max available power
-            0, 0, 0, 0, # reserved
-            23, # ac current rms
-            0, 0, # reserved
-            234, # ac voltage rms
-            0, 0, 0, # reserved
-            2345, # ac active power rms
+        # Assert
+        assert [result.registers for result in results] == [[4, 5, 6], [1, 2, 3], [7, 8]]
+
+    # Write scheduler
+
+    async def test_redundant_setpoint_writes_are_skipped(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, write_scheduler=WriteScheduler(window=0.01))
+        await self.wallbox.connect()
+        # Act
+        await self.wallbox.set_current_setpoint(16)
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CURRENT_SETPOINT, [0])
+        await self.wallbox.set_current_setpoint(16)
+        # Assert
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.CURRENT_SETPOINT) == 0
+        assert self.wallbox.write_scheduler.skipped == 1
+
+    async def test_setpoint_is_written_again_after_reconnect(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, write_scheduler=WriteScheduler())
+        await self.wallbox.connect()
+        await self.wallbox.set_current_setpoint(16)
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CURRENT_SETPOINT, [6])
+        self.wallbox.client.close()
+        await self.wallbox.connect()
+        # Act
+        await self.wallbox.set_current_setpoint(16)
+        # Assert
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.CURRENT_SETPOINT) == 16
+        assert self.wallbox.write_scheduler.skipped == 0
+
+    # Metrics
+
+    async def test_transaction_metrics(self, fake_wallbox_modbus_server):
+        # Arrange
+        metrics = TransactionMetrics()
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, hooks=[metrics])
+        await self.wallbox.connect()
+        # Act
+        await self.wallbox.get_all_values()
+        await self.wallbox.set_current_setpoint(16)
+        # Assert
+        assert sorted(metrics.series) == [
+            (0x3, RegisterAddresses.FIRMWARE_VERSION, 9),
+            (0x3, RegisterAddresses.CONTROL, 3),
+            (0x3, RegisterAddresses.CHARGER_LOCK_STATE, 5),
+            (0x3, RegisterAddresses.MAX_AVAILABLE_CURRENT, 27),
+            (0x6, RegisterAddresses.CURRENT_SETPOINT, 1),
+        ]
+        assert all(series.count == 1 and series.errors == 0 for series in metrics.series.values())
+
+    # Timeouts
+
+    async def test_lost_response_is_retried(self, fake_wallbox_modbus_server):
+        # Arrange
+        server = fake_wallbox_modbus_server
+        await self.wallbox.connect()
+        self.wallbox.client.comm_params.timeout_connect = 0.1
+        set_server_values(server, RegisterAddresses.STATE_OF_CHARGE, [23])
+        lost = []
+        def lose_first_response(response):
+            if not lost:
+                lost.append(response)
+                return b'', True
+            return response, False
+        server.response_manipulator = lose_first_response
+        # Act
+        value = await self.wallbox.get_state_of_charge()
+        # Assert
+        assert value == 23
+        assert len(lost) == 1
+
+    async def test_no_response_closes_connection(self, fake_wallbox_modbus_server):
+        # Arrange
+        server = fake_wallbox_modbus_server
+        await self.wallbox.connect()
+        self.wallbox.client.comm_params.timeout_connect = 0.05
+        server.response_manipulator = lambda response: (b'', True)
+        # Act
+        with pytest.raises(ModbusIOException):
+            await self.wallbox.get_state_of_charge()
+        # Assert
+        assert not self.wallbox.client.connected
+
+    async def test_exception_response_fails_snapshot(self, fake_wallbox_modbus_server):
+        # Arrange
+        def busy(response):
+            exception = ExceptionResponse(response.function_code, ModbusExceptions.SlaveBusy)
+            exception.transaction_id = response.transaction_id
+            exception.slave_id = response.slave_id
+            return exception, False
+        fake_wallbox_modbus_server.response_manipulator = busy
+        await self.wallbox.connect()
+        # Act
+        with pytest.raises(ModbusIOException, match='at 0x1 from unit 1'):
+            await self.wallbox.get_snapshot()
+        # Assert
+        assert self.wallbox._identity is None
+
+    # Managed connection
+
+    async def test_reconnect_and_replay_read(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, reconnect=ReconnectPolicy(backoff=0.01))
+        await self.wallbox.connect()
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.STATE_OF_CHARGE, [23])
+        self.wallbox.client.close() # connection dropped
+        # Act
+        value = await self.wallbox.get_state_of_charge()
+        # Assert
+        assert value == 23
+        assert self.wallbox.client.connected
+
+    async def test_reconnect_after_timeout(self, fake_wallbox_modbus_server):
+        # Arrange
+        server = fake_wallbox_modbus_server
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, reconnect=ReconnectPolicy(backoff=0.01))
+        await self.wallbox.connect()
+        self.wallbox.client.comm_params.timeout_connect = 0.1
+        set_server_values(server, RegisterAddresses.STATE_OF_CHARGE, [23])
+        # the server stops answering on the current connection, without closing it,
+        # and answers again on a new connection
+        connections = []
+        new_connection = server.callback_new_connection
+        def callback_new_connection():
+            connections.append(new_connection())
+            return connections[-1]
+        server.callback_new_connection = callback_new_connection
+        server.response_manipulator = lambda response: (response, False) if connections else (b'', True)
+        # Act
+        value = await self.wallbox.get_state_of_charge()
+        # Assert
+        assert value == 23
+        assert len(connections) == 1
+
+    async def test_circuit_breaker_fails_fast(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, port=503, reconnect=ReconnectPolicy(
+            retries=5, backoff=0.001, failure_threshold=3, reset_timeout=60,
+        ))
+        with pytest.raises(ConnectionException):
+            await self.wallbox.get_state_of_charge()
+        # Act / Assert
+        assert self.wallbox.circuit_breaker.is_open
+        with pytest.raises(CircuitOpenError):
+            await self.wallbox.get_state_of_charge()
+        with pytest.raises(CircuitOpenError):
+            await self.wallbox.connect()
+
+    # Watch
+
+    async def test_watch(self, fake_wallbox_modbus_server):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.connect()
+        watcher = self.wallbox.watch(interval=0.01)
+        # Act
+        first = await anext(watcher)
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.STATE_OF_CHARGE, [24])
+        second = await anext(watcher)
+        await watcher.aclose()
+        # Assert
+        assert first.changes['state_of_charge'] == (None, 23)
+        assert len(first.changes) == 17
+        assert second.changes == {'state_of_charge': (23, 24)}
+        assert second.timestamp >= first.timestamp
+
+    async def test_watch_adapts_interval(self, fake_wallbox_modbus_server, monkeypatch):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_STATE, [ChargerStates.NO_CAR_CONNECTED])
+        await self.wallbox.connect()
+        # after this many sleeps the charger state changes, so the next poll yields
+        next_states = {
+            5: [ChargerStates.CHARGING],
+            7: [ChargerStates.CONNECTED_NOT_CHARGING],
+            9: [ChargerStates.CONNECTED_NOT_CHARGING, 24],
+        }
+        delays = []
+        sleep = asyncio.sleep
+        async def record_sleep(delay):
+            delays.append(delay)
+            if len(delays) in next_states:
+                set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_STATE, next_states[len(delays)])
+            await sleep(0)
+        watcher = self.wallbox.watch(interval=1.0)
+        # Act
+        await anext(watcher)
+        monkeypatch.setattr(asyncio, 'sleep', record_sleep)
+        for _ in next_states:
+            await anext(watcher)
+        monkeypatch.undo()
+        await watcher.aclose()
+        # Assert
+        assert delays == [
+            0.25, 2.0, 4.0, 8.0, 8.0,   # no car connected: backs off up to idle_interval
+            0.25, 0.25,                 # charging: fast_interval
+            0.25, 1.0,                  # car connected, nothing changes: interval
+        ]
+
+    # Apply
+
+    async def test_apply(self, fake_wallbox_modbus_server, connect_to_wallbox):
+        # Act
+        await self.wallbox.apply(
+            control=Control.REMOTE,
+            auto_charging_discharging=AutoChargingDischarging.ENABLE,
+            setpoint_type=SetpointType.POWER,
+            current_setpoint=-16,
+            power_setpoint=3700,
+            verify=True,
+        )
+        # Assert
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.CONTROL) == Control.REMOTE
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.AUTO_CHARGING_DISCHARGING) == AutoChargingDischarging.ENABLE
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.SETPOINT_TYPE) == SetpointType.POWER
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.CURRENT_SETPOINT) == 65536 - 16
+        assert get_server_value(fake_wallbox_modbus_server, RegisterAddresses.POWER_SETPOINT) == 3700
+
+    async def test_apply_unknown_setting(self, fake_wallbox_modbus_server, connect_to_wallbox):
+        # Act / Assert
+        with pytest.raises(TypeError):
+            await self.wallbox.apply(current=16)
+
+    # Any data
+
+    async def test_get_values(self, fake_wallbox_modbus_server, connect_to_wallbox):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        # Act
+        data = await self.wallbox.get_values([
+            RegisterAddresses.CHARGER_STATE,
+            RegisterAddresses.AC_CURRENT_RMS,
+            RegisterAddresses.CONTROL,
+            RegisterAddresses.POWER_SETPOINT,
         ])
-        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_STATE, [
-            ChargerStates.DISCHARGING,
-            23, # state of charge
+        # Assert
+        assert data == {
+            RegisterAddresses.CHARGER_STATE: ChargerStates.DISCHARGING,
+            RegisterAddresses.AC_CURRENT_RMS: 23,
+            RegisterAddresses.CONTROL: Control.REMOTE,
+            RegisterAddresses.POWER_SETPOINT: -2345,
+        }
+
+    async def test_get_values_overlapping_fields(self, fake_wallbox_modbus_server, connect_to_wallbox):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        # Act
+        data = await self.wallbox.get_values([
+            RegisterAddresses.SERIAL_HIGH,
+            RegisterAddresses.SERIAL_LOW,
+            RegisterAddresses.PART_NUMBER_1,
+            RegisterAddresses.PART_NUMBER_2,
         ])
+        # Assert
+        assert data == {
+            RegisterAddresses.SERIAL_HIGH: 23456789,
+            RegisterAddresses.SERIAL_LOW: 60437,
+            RegisterAddresses.PART_NUMBER_1: '!"#$-%-&-\'-(-)*+-,',
+            RegisterAddresses.PART_NUMBER_2: (35<<8)+36,
+        }
+
+    async def test_get_snapshot(self, fake_wallbox_modbus_server):
+        # Arrange
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.connect()
         # Act
-        data = await self.wallbox.get_all_values()
+        snapshot = await self.wallbox.get_snapshot()
         # Assert
-        assert data.get('firmware_version') == 2345
-        assert data.get('serial_number') == 23456789
-        assert data.get('part_number') == '!"#$-%-&-\'-(-)*+-,'
-        assert data.get('control') == 'remote'
-        assert data.get('is_auto_charging_discharging_enabled') == True
-        assert data.get('setpoint_type') == 'power'
-        assert data.get('is_charger_locked') == True
-        assert data.get('current_setpoint') == -23
-        assert data.get('power_setpoint') == -2345
-        assert data.get('max_available_current') == 23
-        assert data.get('max_available_power') == 2345
-        assert data.get('ac_current_rms') == 23
-        assert data.get('ac_voltage_rms') == 234
-        assert data.get('ac_active_power_rms') == 2345
-        assert data.get('charger_state') == 'discharging'
-        assert data.get('state_of_charge') == 23
+        assert snapshot.control == Control.REMOTE
+        assert snapshot.setpoint_type == SetpointType.POWER
+        assert snapshot.charger_lock_state == ChargerLockState.LOCK
+        assert snapshot.power_setpoint == -2345
+        assert snapshot.charger_state == ChargerStates.DISCHARGING
+        assert not hasattr(snapshot, '__dict__')
+        assert_all_values(snapshot.as_dict())
+
+    # Cache
 
+    async def test_cached_reads(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, cache=RegisterCache())
+        await self.wallbox.connect()
+        mock_all_values(fake_wallbox_modbus_server)
+        await self.wallbox.get_all_values()
+        set_server_values(fake_wallbox_modbus_server, RegisterAddresses.CHARGER_LOCK_STATE, [ChargerLockState.UNLOCK])
+        # Act
+        has_control = await self.wallbox.has_control()
+        is_locked = await self.wallbox.is_charger_locked()
+        setpoint = await self.wallbox.get_current_setpoint()
+        # Assert
+        assert has_control
+        assert is_locked # served from the cache
+        assert setpoint == -23
+        assert self.wallbox.cache.hits == 3
+
+    async def test_cache_invalidated_on_write(self, fake_wallbox_modbus_server):
+        # Arrange
+        self.wallbox.close()
+        self.wallbox = WallboxModbus(NULLMODEM_HOST, cache=RegisterCache())
+        await self.wallbox.connect()
+        assert not await self.wallbox.is_charger_locked()
+        # Act
+        await self.wallbox.lock_charger()
+        is_locked = await self.wallbox.is_charger_locked()
+        # Assert
+        assert is_locked
+        assert self.wallbox.cache.hits == 0
+
+
+def mock_all_values(server):
+    set_server_values(server, RegisterAddresses.FIRMWARE_VERSION, [
+        2345, # Firmware version
+        357, # S/N high
+        60437, # S/N low
+        (33<<8)+34, # P/N
+        (35<<8)+36,
+        (37<<8)+38,
+        (39<<8)+40,
+        (41<<8)+42,
+        (43<<8)+44,
+    ])
+    set_server_values(server, RegisterAddresses.CONTROL, [
+        Control.REMOTE,
+        AutoChargingDischarging.ENABLE,
+        SetpointType.POWER,
+    ])
+    set_server_values(server, RegisterAddresses.CHARGER_LOCK_STATE, [
+        ChargerLockState.LOCK,
+        0, # Action - ignored
+        int16_to_uint16(-23), # current setpoint
+        0, # reserved
+        int16_to_uint16(-2345), # power setpoint
+    ])
+    set_server_values(server, RegisterAddresses.MAX_AVAILABLE_CURRENT, [
+        23, # max available current
+        0, # reserved,
+        2345, # max available power
+        0, 0, 0, 0, # reserved
+        23, # ac current rms
+        0, 0, # reserved
+        234, # ac voltage rms
+        0, 0, 0, # reserved
+        2345, # ac active power rms
+    ])
+    set_server_values(server, RegisterAddresses.CHARGER_STATE, [
+        ChargerStates.DISCHARGING,
+        23, # state of charge
+    ])
+
+def assert_all_values(data):
+    assert data.get('firmware_version') == 2345
+    assert data.get('serial_number') == 23456789
+    assert data.get('part_number') == '!"#$-%-&-\'-(-)*+-,'
+    assert data.get('control') == 'remote'
+    assert data.get('is_auto_charging_discharging_enabled') == True
+    assert data.get('setpoint_type') == 'power'
+    assert data.get('is_charger_locked') == True
+    assert data.get('current_setpoint') == -23
+    assert data.get('power_setpoint') == -2345
+    assert data.get('max_available_current') == 23
+    assert data.get('max_available_power') == 2345
+    assert data.get('ac_current_rms') == 23
+    assert data.get('ac_voltage_rms') == 234
+    assert data.get('ac_active_power_rms') == 2345
+    assert data.get('charger_state') == 'discharging'
+    assert data.get('state_of_charge') == 23
 
 def mock_car_is_not_connected(server):
     set_server_values(server, RegisterAddresses.CHARGER_STATE, [ChargerStates.NO_CAR_CONNECTED])
 
 def mock_car_is_connected(server):
     set_server_values(server, RegisterAddresses.CHARGER_STATE, [ChargerStates.CONNECTED_NOT_CHARGING])
-
-def set_server_values(server, start_address, values):
-    fc_as_hex = 0x3
-    slave_id = 0
-    return server.context[slave_id].setValues(fc_as_hex, start_address, values)
-
-def get_server_value(server, address):
-    fc_as_hex = 0x3
-    slave_id = 0
-    return server.context[slave_id].getValues(fc_as_hex, address)[0]
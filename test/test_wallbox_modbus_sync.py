@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import pytest
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext, ModbusSequentialDataBlock
+from pymodbus.server import ModbusTcpServer
+from wallbox_modbus import WallboxModbusSync
+from wallbox_modbus.constants import RegisterAddresses
+from conftest import set_server_values
+
+HOST = '127.0.0.1'
+PORT = 5031
+
+@pytest.fixture
+def tcp_server():
+    # a real TCP server on its own loop and thread, the sync facade runs its own loop
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    context = ModbusServerContext(slaves=ModbusSlaveContext(hr=ModbusSequentialDataBlock(0x00, [0] * 547)), single=True)
+    async def start():
+        server = ModbusTcpServer(context=context, address=(HOST, PORT))
+        asyncio.create_task(server.serve_forever())
+        await asyncio.sleep(0.1)
+        return server
+    server = asyncio.run_coroutine_threadsafe(start(), loop).result(5)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_blocking_calls(tcp_server):
+    set_server_values(tcp_server, RegisterAddresses.STATE_OF_CHARGE, [23])
+    with WallboxModbusSync(HOST, PORT) as wallbox:
+        assert wallbox.get_state_of_charge() == 23
+        wallbox.set_current_setpoint(-16)
+        assert wallbox.get_current_setpoint() == -16
+        assert wallbox.get_all_values().get('state_of_charge') == 23
+
+def test_connection_is_reused(tcp_server):
+    with WallboxModbusSync(HOST, PORT) as wallbox:
+        wallbox.get_state_of_charge()
+        client = wallbox.wallbox.client
+        wallbox.get_state_of_charge()
+        assert len(tcp_server.active_connections) == 1
+        assert wallbox.wallbox.client is client
+
+def test_unknown_method():
+    with WallboxModbusSync(HOST, PORT) as wallbox:
+        with pytest.raises(AttributeError):
+            wallbox.close_all()
+        with pytest.raises(AttributeError):
+            wallbox._read
+
+def test_timed_out_call_is_cancelled():
+    cancelled = threading.Event()
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    with WallboxModbusSync(HOST, PORT, timeout=0.1) as wallbox:
+        with pytest.raises(TimeoutError):
+            wallbox._run(hang())
+        assert cancelled.wait(1)
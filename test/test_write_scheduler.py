@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from wallbox_modbus.constants import Action, RegisterAddresses
+from wallbox_modbus.write_scheduler import WriteScheduler
+from conftest import FakeClock
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeResponse:
+
+    def isError(self):
+        return False
+
+
+class FakeCharger:
+
+    def __init__(self):
+        self.writes = []
+
+    async def send(self, address, value):
+        self.writes.append((address, value))
+        return FakeResponse()
+
+
+async def test_redundant_writes_are_skipped():
+    charger = FakeCharger()
+    scheduler = WriteScheduler()
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    assert charger.writes == [(RegisterAddresses.CURRENT_SETPOINT, 16)]
+    assert (scheduler.sent, scheduler.skipped) == (1, 1)
+
+async def test_observed_values_suppress_writes():
+    charger = FakeCharger()
+    scheduler = WriteScheduler()
+    scheduler.observe(RegisterAddresses.CURRENT_SETPOINT, [16, 0, 3700])
+    await scheduler.write(RegisterAddresses.POWER_SETPOINT, 3700, charger.send)
+    assert charger.writes == []
+
+async def test_actions_are_never_skipped():
+    charger = FakeCharger()
+    scheduler = WriteScheduler()
+    await scheduler.write(RegisterAddresses.ACTION, Action.STOP_CHARGING_DISCHARGING, charger.send)
+    await scheduler.write(RegisterAddresses.ACTION, Action.STOP_CHARGING_DISCHARGING, charger.send)
+    assert len(charger.writes) == 2
+
+async def test_writes_within_window_are_merged():
+    charger = FakeCharger()
+    scheduler = WriteScheduler(window=0.05)
+    await asyncio.gather(*(
+        scheduler.write(RegisterAddresses.CURRENT_SETPOINT, value, charger.send)
+        for value in (10, 12, 14)
+    ))
+    assert charger.writes == [(RegisterAddresses.CURRENT_SETPOINT, 14)]
+    assert scheduler.merged == 2
+
+async def test_safety_actions_are_not_delayed():
+    charger = FakeCharger()
+    scheduler = WriteScheduler(window=10)
+    pending = asyncio.create_task(scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(
+        scheduler.write(RegisterAddresses.ACTION, Action.STOP_CHARGING_DISCHARGING, charger.send), 0.1)
+    assert charger.writes == [(RegisterAddresses.ACTION, Action.STOP_CHARGING_DISCHARGING)]
+    pending.cancel()
+
+async def test_dependent_registers_are_forgotten():
+    charger = FakeCharger()
+    scheduler = WriteScheduler()
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    await scheduler.write(RegisterAddresses.ACTION, Action.STOP_CHARGING_DISCHARGING, charger.send)
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    assert charger.writes.count((RegisterAddresses.CURRENT_SETPOINT, 16)) == 2
+
+async def test_direct_writes_supersede_pending_writes():
+    charger = FakeCharger()
+    scheduler = WriteScheduler(window=0.05)
+    pending = asyncio.create_task(scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 10, charger.send))
+    await asyncio.sleep(0)
+    scheduler.written(RegisterAddresses.CURRENT_SETPOINT, [16])
+    await pending
+    assert charger.writes == []
+
+async def test_old_values_do_not_suppress_writes():
+    charger = FakeCharger()
+    clock = FakeClock()
+    scheduler = WriteScheduler(max_age=5, clock=clock)
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    clock.now = 6
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    assert charger.writes == [(RegisterAddresses.CURRENT_SETPOINT, 16)] * 2
+
+async def test_clear_forgets_values():
+    charger = FakeCharger()
+    scheduler = WriteScheduler()
+    scheduler.observe(RegisterAddresses.CURRENT_SETPOINT, [16])
+    scheduler.clear()
+    await scheduler.write(RegisterAddresses.CURRENT_SETPOINT, 16, charger.send)
+    assert charger.writes == [(RegisterAddresses.CURRENT_SETPOINT, 16)]
@@ -1 +1,19 @@
 from wallbox_modbus.wallbox_modbus import WallboxModbus
+from wallbox_modbus.register_cache import RegisterCache
+from wallbox_modbus.wallbox_fleet import FleetResults, WallboxFleet
+from wallbox_modbus.write_scheduler import WriteScheduler
+from wallbox_modbus.snapshot import WallboxSnapshot
+from wallbox_modbus.recorder import SnapshotRecorder, SnapshotRecording
+from wallbox_modbus.metrics import Transaction, TransactionHook, TransactionMetrics
+from wallbox_modbus.connection import CircuitBreaker, CircuitOpenError, ReconnectPolicy
+from wallbox_modbus.gateway import ModbusGateway
+from wallbox_modbus.wallbox_modbus_sync import WallboxModbusSync
+from wallbox_modbus.request_scheduler import (
+    RequestDroppedError,
+    RequestPriority,
+    RequestScheduler,
+    request_deadline,
+)
+from wallbox_modbus.poll_scheduler import PollScheduler
+from wallbox_modbus.proxy import WallboxProxy
+from wallbox_modbus.capture import ReplayServer, TrafficRecorder, TrafficRecording
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import bisect
+import struct
+import time
+from typing import NamedTuple
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext
+from pymodbus.pdu import ModbusExceptions
+from pymodbus.server import ModbusTcpServer
+from pymodbus.server.async_io import ModbusServerRequestHandler
+
+# File layout: MAGIC followed by one record per request/response pair, in the
+# order the responses arrived. A record is RECORD followed by the request PDU and
+# the response PDU; a request that got no response has an empty response PDU.
+MAGIC = b'WBXCAP01'
+RECORD = struct.Struct('<dfBBB')    # time sent, seconds until answered, unit id, request and response size
+MBAP = struct.Struct('>HHHB')       # transaction id, protocol id, length, unit id
+
+
+class Exchange(NamedTuple):
+    timestamp: float    # time.time() the request was sent
+    duration: float     # seconds until the response arrived, or until given up
+    unit_id: int
+    request: bytes      # PDU, function code first
+    response: bytes     # PDU, empty when no response arrived
+
+
+def to_pdu(message) -> bytes:
+    return bytes([message.function_code]) + message.encode()
+
+
+class TrafficRecorder:
+    # Captures the Modbus traffic of WallboxModbus(..., traffic_recorder=TrafficRecorder(path))
+
+    def __init__(self, path) -> None:
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self.count = 0
+
+    def append(self, exchange: Exchange):
+        self._file.write(RECORD.pack(
+            exchange.timestamp, exchange.duration, exchange.unit_id,
+            len(exchange.request), len(exchange.response),
+        ))
+        self._file.write(exchange.request)
+        self._file.write(exchange.response)
+        self.count += 1
+
+    def on_response(self, request, timestamp, start, future):
+        # done callback of the response future of request, sent at timestamp
+        if future.cancelled() or future.exception() is not None:
+            response = b''
+        else:
+            response = to_pdu(future.result())
+        self.append(Exchange(timestamp, time.perf_counter() - start, request.slave_id, to_pdu(request), response))
+
+    def close(self):
+        self._file.close()
+
+
+class TrafficRecording:
+
+    def __init__(self, path) -> None:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a traffic recording")
+        self.exchanges = []
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(data):
+            timestamp, duration, unit_id, request_size, response_size = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            request = data[offset:offset + request_size]
+            response = data[offset + request_size:offset + request_size + response_size]
+            offset += request_size + response_size
+            self.exchanges.append(Exchange(timestamp, duration, unit_id, request, response))
+
+    def __len__(self):
+        return len(self.exchanges)
+
+    def __iter__(self):
+        return iter(self.exchanges)
+
+
+class ReplayServer(ModbusTcpServer):
+    # Answers requests with the responses of a TrafficRecording, looked up by unit id
+    # and request PDU. With a speed, the recording plays along with the time since
+    # the first request, speed times faster than it was recorded: a request gets the
+    # latest response recorded before that point, after its recorded duration. With
+    # speed None the recorded responses to a request are returned one after the
+    # other, without delay. Requests that were never recorded get an exception.
+
+    def __init__(self, recording, address=('', 5020), speed=1.0) -> None:
+        super().__init__(
+            context=ModbusServerContext(slaves=ModbusSlaveContext(), single=True),
+            address=address,
+        )
+        self.speed = speed
+        self.answered = 0
+        self.unknown = 0
+        self._exchanges = {}    # (unit id, request PDU) -> exchanges, oldest first
+        self._offsets = {}      # (unit id, request PDU) -> seconds since the start of the recording
+        self._next = {}         # (unit id, request PDU) -> index of the next exchange, without speed
+        self._start = None
+        start = min((exchange.timestamp for exchange in recording), default=0)
+        for exchange in sorted(recording, key=lambda exchange: exchange.timestamp):
+            key = (exchange.unit_id, exchange.request)
+            self._exchanges.setdefault(key, []).append(exchange)
+            self._offsets.setdefault(key, []).append(exchange.timestamp - start)
+
+    def callback_new_connection(self):
+        return _ReplayRequestHandler(self)
+
+    def answer(self, unit_id, request):
+        # returns (delay, response PDU), the response is empty for a request that was
+        # not answered when recorded
+        key = (unit_id, request)
+        exchanges = self._exchanges.get(key)
+        if exchanges is None:
+            self.unknown += 1
+            return 0.0, bytes([request[0] | 0x80, ModbusExceptions.GatewayNoResponse])
+        self.answered += 1
+        if self.speed is None:
+            index = self._next.get(key, 0)
+            self._next[key] = (index + 1) % len(exchanges)
+            return 0.0, exchanges[index].response
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        position = (now - self._start) * self.speed
+        index = max(bisect.bisect_right(self._offsets[key], position) - 1, 0)
+        exchange = exchanges[index]
+        return exchange.duration / self.speed, exchange.response
+
+
+class _ReplayRequestHandler(ModbusServerRequestHandler):
+
+    async def _async_execute(self, request, *addr):
+        delay, response = self.server.answer(request.slave_id, to_pdu(request))
+        if delay:
+            await asyncio.sleep(delay)
+        if not response:
+            return
+        frame = MBAP.pack(request.transaction_id, 0, len(response) + 1, request.slave_id) + response
+        self.server_send(frame, *addr, skip_encoding=True)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Answer Modbus requests from a traffic recording")
+    parser.add_argument('path', help="recording made with TrafficRecorder")
+    parser.add_argument('--address', default='')
+    parser.add_argument('--port', type=int, default=5020)
+    parser.add_argument('--speed', type=float, default=1.0, help="replay this many times faster than recorded")
+    parser.add_argument('--sequential', action='store_true', help="replay responses in order, without delays")
+    args = parser.parse_args()
+    server = ReplayServer(
+        TrafficRecording(args.path), (args.address, args.port), None if args.sequential else args.speed,
+    )
+    await server.serve_forever()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+import struct
+from functools import lru_cache
+from wallbox_modbus.constants import REGISTER_MAP, RegisterFormat, RegisterType
+
+_FORMATS = {
+    RegisterType.UINT16: 'H',
+    RegisterType.INT16: 'h',
+    RegisterType.UINT32: 'I',
+}
+
+
+def register_format(address) -> RegisterFormat:
+    return REGISTER_MAP.get(address) or RegisterFormat(RegisterType.UINT16)
+
+
+class BlockDecoder:
+    # Decodes a fixed set of fields from a block of registers starting at address.
+    # pymodbus hands out the registers as a list of ints, they are packed back to
+    # bytes once and all fields are then unpacked by one precompiled struct.
+
+    def __init__(self, address, count, fields) -> None:
+        self.address = address
+        self.count = count
+        self.fields = tuple(fields)
+        fmt = '>'
+        position = address
+        converters = []
+        covered = []
+        for i, field in enumerate(self.fields):
+            register = register_format(field)
+            if address < field < position:
+                # inside the field before it, e.g. SERIAL_LOW of SERIAL_HIGH: the raw register
+                covered.append((i, field - address))
+                continue
+            if field < position or field + register.width > address + count:
+                raise ValueError(f"Field {int(field):#x} does not fit in block {int(address):#x}+{count}")
+            if field > position:
+                fmt += f'{2 * (field - position)}x'
+            if register.type == RegisterType.STRING:
+                fmt += f'{2 * register.width}s'
+                converters.append((i, to_string))
+            else:
+                fmt += _FORMATS[register.type]
+                if register.enum is not None:
+                    converters.append((i, to_enum(register.enum)))
+            position = field + register.width
+        self._pack = struct.Struct(f'>{count}H').pack
+        self._unpack_from = struct.Struct(fmt).unpack_from
+        self._converters = tuple(converters)
+        self._covered = tuple(covered)
+
+    def decode(self, registers) -> tuple:
+        values = self._unpack_from(self._pack(*registers[:self.count]))
+        if not self._converters and not self._covered:
+            return values
+        values = list(values)
+        for i, offset in self._covered:
+            values.insert(i, registers[offset])
+        for i, convert in self._converters:
+            values[i] = convert(values[i])
+        return tuple(values)
+
+    def decode_dict(self, registers) -> dict:
+        return dict(zip(self.fields, self.decode(registers)))
+
+
+@lru_cache(maxsize=256)
+def get_decoder(address, count, fields=None) -> BlockDecoder:
+    # fields defaults to all fields of REGISTER_MAP within the block
+    if fields is None:
+        fields = tuple(field for field in REGISTER_MAP if address <= field < address + count)
+    return BlockDecoder(address, count, sorted(fields))
+
+
+def to_enum(enum):
+    members = enum._value2member_map_
+    return lambda value: members.get(value, value)
+
+def to_string(value):
+    return value.decode('latin-1')
@@ -0,0 +1,75 @@
+import asyncio
+import random
+import time
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+# errors after which the connection is considered broken
+CONNECTION_ERRORS = (ConnectionException, ModbusIOException, asyncio.TimeoutError, OSError)
+
+
+class CircuitOpenError(ConnectionException):
+    pass
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive failures, after which requests fail
+    # fast. After reset_timeout seconds one trial request is let through
+    # (half open); its outcome closes or re-opens the circuit. Other requests keep
+    # failing fast while the trial is in flight, a trial that never reports an
+    # outcome is followed by another one after reset_timeout.
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.half_open = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        return self.opened_at is None or self.clock() - self.opened_at >= self.reset_timeout
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit open after {self.failures} failures")
+        if self.opened_at is not None:
+            # half open, this is the trial; restarting the timer holds back the others
+            self.opened_at = self.clock()
+            self.half_open = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.half_open = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.half_open or self.failures >= self.failure_threshold:
+            # a failed trial re-opens the circuit straight away
+            self.opened_at = self.clock()
+            self.half_open = False
+
+
+class ReconnectPolicy:
+    # Configuration of a managed connection: WallboxModbus(..., reconnect=ReconnectPolicy())
+
+    def __init__(self, retries=3, backoff=0.1, max_backoff=10.0, jitter=0.5,
+                 failure_threshold=5, reset_timeout=30.0, rng=random.random) -> None:
+        self.retries = retries          # replays of a failed read
+        self.backoff = backoff          # seconds before the first replay, doubles every attempt
+        self.max_backoff = max_backoff
+        self.jitter = jitter            # fraction of the delay that is randomized
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.rng = rng
+
+    def delay(self, attempt) -> float:
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay * (1 - self.jitter * self.rng())
+
+    def circuit_breaker(self) -> CircuitBreaker:
+        return CircuitBreaker(self.failure_threshold, self.reset_timeout)
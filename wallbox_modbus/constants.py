@@ -1,4 +1,5 @@
 import enum
+from typing import NamedTuple
 
 class Control(int, enum.Enum):
     USER = 0,
@@ -64,3 +65,54 @@ class RegisterAddresses(int, enum.Enum):
 
     CHARGER_STATE = 0x219
     STATE_OF_CHARGE = 0x21a     # RO, (0% to 100%)
+
+class RegisterClass(int, enum.Enum):
+    IDENTITY = 0        # 0x1-0x9, fixed for the lifetime of a connection
+    CONFIGURATION = 1   # 0x50-0x57
+    CONTROL = 2         # 0x100-0x104
+    MEASUREMENT = 3     # 0x200-0x21a
+
+class RegisterType(int, enum.Enum):
+    UINT16 = 0
+    INT16 = 1
+    UINT32 = 2  # high word first
+    STRING = 3  # two latin-1 characters per register, high byte first
+
+class RegisterFormat(NamedTuple):
+    type: RegisterType
+    width: int = 1          # number of registers
+    enum: type = None       # enum the raw value maps to, if any
+
+# how to decode the value starting at each register, registers that are not
+# listed hold a plain uint16
+REGISTER_MAP = {
+    RegisterAddresses.FIRMWARE_VERSION: RegisterFormat(RegisterType.UINT16),
+    RegisterAddresses.SERIAL_HIGH: RegisterFormat(RegisterType.UINT32, 2),
+    RegisterAddresses.PART_NUMBER_1: RegisterFormat(RegisterType.STRING, 6),
+
+    RegisterAddresses.CONTROL: RegisterFormat(RegisterType.UINT16, 1, Control),
+    RegisterAddresses.AUTO_CHARGING_DISCHARGING: RegisterFormat(RegisterType.UINT16, 1, AutoChargingDischarging),
+    RegisterAddresses.SETPOINT_TYPE: RegisterFormat(RegisterType.UINT16, 1, SetpointType),
+
+    RegisterAddresses.CHARGER_LOCK_STATE: RegisterFormat(RegisterType.UINT16, 1, ChargerLockState),
+    RegisterAddresses.ACTION: RegisterFormat(RegisterType.UINT16, 1, Action),
+    RegisterAddresses.CURRENT_SETPOINT: RegisterFormat(RegisterType.INT16),
+    RegisterAddresses.POWER_SETPOINT: RegisterFormat(RegisterType.INT16),
+
+    RegisterAddresses.MAX_AVAILABLE_CURRENT: RegisterFormat(RegisterType.UINT16),
+    RegisterAddresses.MAX_AVAILABLE_POWER: RegisterFormat(RegisterType.UINT16),
+    RegisterAddresses.AC_CURRENT_RMS: RegisterFormat(RegisterType.INT16),
+    RegisterAddresses.AC_VOLTAGE_RMS: RegisterFormat(RegisterType.UINT16),
+    RegisterAddresses.AC_ACTIVE_POWER_RMS: RegisterFormat(RegisterType.INT16),
+
+    RegisterAddresses.CHARGER_STATE: RegisterFormat(RegisterType.UINT16, 1, ChargerStates),
+    RegisterAddresses.STATE_OF_CHARGE: RegisterFormat(RegisterType.UINT16),
+}
+
+# blocks read for a full snapshot
+IDENTITY_BLOCK = (RegisterAddresses.FIRMWARE_VERSION, 9)
+CONTROL_BLOCK = (RegisterAddresses.CONTROL, 3)
+CHARGER_LOCK_STATE_BLOCK = (RegisterAddresses.CHARGER_LOCK_STATE, 5)
+MEASUREMENT_BLOCK = (RegisterAddresses.MAX_AVAILABLE_CURRENT, 27)
+SNAPSHOT_BLOCKS = (IDENTITY_BLOCK, CONTROL_BLOCK, CHARGER_LOCK_STATE_BLOCK, MEASUREMENT_BLOCK)
+SNAPSHOT_WIDTH = sum(count for _, count in SNAPSHOT_BLOCKS)
@@ -0,0 +1,73 @@
+import numpy as np
+from wallbox_modbus.codec import register_format
+from wallbox_modbus.constants import (
+    SNAPSHOT_BLOCKS,
+    SNAPSHOT_WIDTH,
+    ChargerStates,
+    RegisterAddresses,
+    RegisterType,
+)
+
+# the blocks of a snapshot are laid out next to each other in one row per charger
+def _column_offsets():
+    offsets = {}
+    offset = 0
+    for address, count in SNAPSHOT_BLOCKS:
+        for i in range(count):
+            offsets[address + i] = offset + i
+        offset += count
+    return offsets
+
+COLUMN_OFFSETS = _column_offsets()
+
+
+class FleetColumns:
+    # Raw registers of a whole fleet in one (chargers x registers) uint16 matrix.
+    # Fields are decoded per column, for all chargers at once.
+
+    def __init__(self, names, registers, valid, errors) -> None:
+        self.names = names          # charger name per row
+        self.registers = registers  # uint16 matrix, rows of failed chargers are 0
+        self.valid = valid          # bool per row, False when the charger failed
+        self.errors = errors        # name -> exception
+
+    @classmethod
+    def allocate(cls, names, out=None):
+        if out is None or out.shape != (len(names), SNAPSHOT_WIDTH):
+            out = np.zeros((len(names), SNAPSHOT_WIDTH), dtype=np.uint16)
+        return cls(list(names), out, np.zeros(len(names), dtype=bool), {})
+
+    def set_row(self, row, blocks):
+        offset = 0
+        for registers in blocks:
+            self.registers[row, offset:offset+len(registers)] = registers
+            offset += len(registers)
+        self.valid[row] = True
+
+    def column(self, field) -> np.ndarray:
+        # decoded values of one field for all chargers
+        offset = COLUMN_OFFSETS[field]
+        register = register_format(field)
+        if register.type == RegisterType.INT16:
+            return self.registers[:, offset].view(np.int16)
+        if register.type == RegisterType.UINT32:
+            return (self.registers[:, offset].astype(np.uint32) << 16) | self.registers[:, offset+1]
+        if register.type == RegisterType.STRING:
+            words = self.registers[:, offset:offset+register.width].astype('>u2')
+            return words.view(f'S{2 * register.width}').ravel()
+        return self.registers[:, offset]
+
+    def total(self, field):
+        # sum of one field over all chargers that responded
+        return self.column(field)[self.valid].sum(dtype=np.int64)
+
+    def state_counts(self) -> dict:
+        states = self.column(RegisterAddresses.CHARGER_STATE)[self.valid]
+        counts = np.bincount(states, minlength=len(ChargerStates))
+        return {state: int(counts[state]) for state in ChargerStates}
+
+    def charger_states(self) -> np.ndarray:
+        # lower case state name per charger, as in WallboxModbus.get_all_values
+        names = np.array([state.name.lower() for state in ChargerStates] + ['unknown'])
+        states = self.column(RegisterAddresses.CHARGER_STATE)
+        return names[np.minimum(states, len(ChargerStates))]
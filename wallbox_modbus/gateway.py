@@ -0,0 +1,32 @@
+from pymodbus.client import AsyncModbusTcpClient
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+
+
+class ModbusGateway:
+    # One Modbus TCP connection to a gateway, shared by a WallboxModbus handle per
+    # charger (unit id) behind it. Requests of all handles are pipelined over the
+    # connection and matched up by transaction id.
+
+    def __init__(self, host, port=502) -> None:
+        self.host = host
+        self.port = port
+        self.wallboxes = {}     # unit id -> WallboxModbus
+        self.client = AsyncModbusTcpClient(host=host, port=port, on_reconnect_callback=self._clear_identities)
+
+    def wallbox(self, unit_id, **kwargs) -> WallboxModbus:
+        if unit_id not in self.wallboxes:
+            self.wallboxes[unit_id] = WallboxModbus(
+                self.host, self.port, unit_id=unit_id, client=self.client, **kwargs,
+            )
+        return self.wallboxes[unit_id]
+
+    async def connect(self):
+        if not self.client.connected:
+            await self.client.connect()
+
+    def close(self):
+        self.client.close()
+
+    def _clear_identities(self):
+        for wallbox in self.wallboxes.values():
+            wallbox._clear_identity()
@@ -0,0 +1,111 @@
+import bisect
+from typing import NamedTuple
+
+READ_HOLDING_REGISTERS = 0x3
+WRITE_SINGLE_REGISTER = 0x6
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+# upper bounds of the latency histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+MBAP_SIZE = 7
+
+
+class Transaction(NamedTuple):
+    function_code: int
+    address: int
+    count: int          # registers read or written
+    duration: float     # seconds
+    error: bool         # exception response or failed request
+    timeout: bool       # no response received
+
+
+class TransactionHook:
+    # Base class for hooks passed to WallboxModbus(..., hooks=[...]); on_transaction
+    # is called for every Modbus transaction sent to the charger.
+
+    def on_transaction(self, transaction: Transaction):
+        pass
+
+
+def frame_sizes(function_code, count):
+    # returns the (request, response) Modbus TCP frame sizes in bytes
+    if function_code == READ_HOLDING_REGISTERS:
+        return MBAP_SIZE + 5, MBAP_SIZE + 2 + 2 * count
+    if function_code == WRITE_MULTIPLE_REGISTERS:
+        return MBAP_SIZE + 6 + 2 * count, MBAP_SIZE + 5
+    return MBAP_SIZE + 5, MBAP_SIZE + 5
+
+
+class _Series:
+
+    __slots__ = ('count', 'errors', 'timeouts', 'bytes_sent', 'bytes_received', 'duration_sum', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.duration_sum = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+
+
+class TransactionMetrics(TransactionHook):
+    # Counts transactions, errors, timeouts and bytes and keeps a latency
+    # histogram, per function code and register block.
+
+    def __init__(self) -> None:
+        self.series = {}    # (function_code, address, count) -> _Series
+
+    def on_transaction(self, transaction: Transaction):
+        key = (transaction.function_code, transaction.address, transaction.count)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _Series()
+        series.count += 1
+        series.duration_sum += transaction.duration
+        series.buckets[bisect.bisect_left(DURATION_BUCKETS, transaction.duration)] += 1
+        request_size, response_size = frame_sizes(transaction.function_code, transaction.count)
+        series.bytes_sent += request_size
+        if transaction.timeout:
+            series.timeouts += 1
+        elif transaction.error:
+            series.errors += 1
+        else:
+            series.bytes_received += response_size
+
+    def render_prometheus(self, labels=None) -> str:
+        # renders all metrics in the Prometheus text exposition format; labels is
+        # an optional dict of extra labels, e.g. {'charger': 'garage'}
+        extra = ''.join(f',{name}="{value}"' for name, value in (labels or {}).items())
+        lines = []
+        def metric(name, kind, help, samples):
+            lines.append(f'# HELP wallbox_modbus_{name} {help}')
+            lines.append(f'# TYPE wallbox_modbus_{name} {kind}')
+            lines.extend(samples)
+        def label(key):
+            function_code, address, count = key
+            return f'function_code="{function_code}",block="{address:#06x}+{count}"{extra}'
+        items = sorted(self.series.items())
+        for name, attribute, help in (
+            ('transactions_total', 'count', 'Modbus transactions sent.'),
+            ('transaction_errors_total', 'errors', 'Modbus transactions that failed.'),
+            ('transaction_timeouts_total', 'timeouts', 'Modbus transactions without a response.'),
+            ('bytes_sent_total', 'bytes_sent', 'Modbus TCP bytes sent.'),
+            ('bytes_received_total', 'bytes_received', 'Modbus TCP bytes received.'),
+        ):
+            metric(name, 'counter', help, [
+                f'wallbox_modbus_{name}{{{label(key)}}} {getattr(series, attribute)}' for key, series in items
+            ])
+        samples = []
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket in zip(DURATION_BUCKETS + (float('inf'),), series.buckets):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                samples.append(f'wallbox_modbus_transaction_duration_seconds_bucket{{{label(key)},le="{le}"}} {cumulative}')
+            samples.append(f'wallbox_modbus_transaction_duration_seconds_sum{{{label(key)}}} {series.duration_sum}')
+            samples.append(f'wallbox_modbus_transaction_duration_seconds_count{{{label(key)}}} {series.count}')
+        metric('transaction_duration_seconds', 'histogram', 'Modbus transaction latency.', samples)
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from wallbox_modbus.codec import get_decoder, register_format
+from wallbox_modbus.constants import SNAPSHOT_BLOCKS, RegisterAddresses
+from wallbox_modbus.read_planner import plan_reads
+from wallbox_modbus.snapshot import WallboxSnapshot
+
+# seconds between refreshes of a field, None reads it once
+DEFAULT_INTERVALS = {
+    RegisterAddresses.FIRMWARE_VERSION: None,
+    RegisterAddresses.SERIAL_HIGH: None,
+    RegisterAddresses.PART_NUMBER_1: None,
+
+    RegisterAddresses.CONTROL: 30.0,
+    RegisterAddresses.AUTO_CHARGING_DISCHARGING: 30.0,
+    RegisterAddresses.SETPOINT_TYPE: 30.0,
+
+    RegisterAddresses.CHARGER_LOCK_STATE: 5.0,
+    RegisterAddresses.ACTION: 5.0,
+    RegisterAddresses.CURRENT_SETPOINT: 5.0,
+    RegisterAddresses.POWER_SETPOINT: 5.0,
+
+    RegisterAddresses.MAX_AVAILABLE_CURRENT: 5.0,
+    RegisterAddresses.MAX_AVAILABLE_POWER: 5.0,
+    RegisterAddresses.AC_CURRENT_RMS: 1.0,
+    RegisterAddresses.AC_VOLTAGE_RMS: 1.0,
+    RegisterAddresses.AC_ACTIVE_POWER_RMS: 1.0,
+    RegisterAddresses.CHARGER_STATE: 1.0,
+    RegisterAddresses.STATE_OF_CHARGE: 10.0,
+}
+
+
+class PollScheduler:
+    # Keeps a merged view of the fields in intervals up to date. Every tick only the
+    # fields that are due are read, coalesced into as few range reads as possible;
+    # other fields covered by those reads are refreshed along the way.
+
+    def __init__(self, wallbox, intervals=None, clock=time.monotonic) -> None:
+        self.wallbox = wallbox
+        self.intervals = {
+            RegisterAddresses(field): interval
+            for field, interval in (DEFAULT_INTERVALS if intervals is None else intervals).items()
+        }
+        self.clock = clock
+        self.values = {}        # field -> latest decoded value
+        self.refreshed = {}     # field -> clock() of the latest read
+        self.reads = 0
+        self.registers_read = 0
+        self._registers = {}    # address -> latest raw register value
+
+    def due(self, now=None) -> list:
+        now = self.clock() if now is None else now
+        return [
+            field for field, interval in self.intervals.items()
+            if field not in self.refreshed or (interval is not None and now - self.refreshed[field] >= interval)
+        ]
+
+    def next_due(self):
+        # clock() at which the next field is due, None if all fields are read once;
+        # fields that were never read are due now
+        if any(field not in self.refreshed for field in self.intervals):
+            return self.clock()
+        times = [
+            self.refreshed[field] + interval
+            for field, interval in self.intervals.items()
+            if interval is not None
+        ]
+        return min(times, default=None)
+
+    def invalidate(self, fields=None):
+        # forces a refresh of fields, or of all fields, on the next tick
+        for field in self.intervals if fields is None else fields:
+            self.refreshed.pop(RegisterAddresses(field), None)
+
+    async def tick(self) -> dict:
+        # reads the due fields, returns the fields whose value changed
+        due = self.due()
+        if not due:
+            return {}
+        plan = plan_reads(
+            address
+            for field in due
+            for address in range(field, field + register_format(field).width)
+        )
+        results = await self.wallbox._read_blocks(plan)
+        now = self.clock()
+        changes = {}
+        for (address, count), result in zip(plan, results):
+            self.reads += 1
+            self.registers_read += count
+            self._registers.update(enumerate(result.registers, address))
+            block_fields = tuple(sorted(
+                field for field in self.intervals
+                if address <= field and field + register_format(field).width <= address + count
+            ))
+            for field, value in get_decoder(address, count, block_fields).decode_dict(result.registers).items():
+                self.refreshed[field] = now
+                if self.values.get(field) != value or field not in self.values:
+                    changes[field] = value
+                self.values[field] = value
+        return changes
+
+    async def run(self):
+        # Async generator yielding the changed fields after every tick, sleeping
+        # until the next field is due in between.
+        while True:
+            changes = await self.tick()
+            if changes:
+                yield changes
+            next_due = self.next_due()
+            if next_due is None:
+                return
+            await asyncio.sleep(max(next_due - self.clock(), 0))
+
+    def snapshot(self) -> WallboxSnapshot:
+        # the merged view as a WallboxSnapshot, fields that are not polled are 0
+        return WallboxSnapshot.from_registers(*(
+            [self._registers.get(addr, 0) for addr in range(address, address + count)]
+            for address, count in SNAPSHOT_BLOCKS
+        ))
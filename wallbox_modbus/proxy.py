@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+from pymodbus.datastore import ModbusServerContext
+from pymodbus.datastore.context import ModbusBaseSlaveContext
+from pymodbus.exceptions import ModbusException, ModbusIOException
+from pymodbus.server import ModbusTcpServer
+from wallbox_modbus.connection import CONNECTION_ERRORS
+from wallbox_modbus.constants import SNAPSHOT_BLOCKS, RegisterClass
+from wallbox_modbus.register_cache import RegisterCache, register_class
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+
+
+class _ProxySlaveContext(ModbusBaseSlaveContext):
+    # Datastore of the downstream server, holding registers are served by the proxy.
+    # Addresses are used as is, like the charger does.
+
+    def __init__(self, proxy) -> None:
+        self.proxy = proxy
+
+    def validate(self, fc_as_hex, address, count=1):
+        return fc_as_hex in (0x3, 0x6, 0x10) and 0 <= address and address + count <= 0x10000
+
+    async def async_getValues(self, fc_as_hex, address, count=1):
+        return await self.proxy.read(address, count)
+
+    async def async_setValues(self, fc_as_hex, address, values):
+        await self.proxy.write(address, values)
+
+    def getValues(self, fc_as_hex, address, count=1):
+        raise NotImplementedError("The proxy datastore is asynchronous")
+
+    def setValues(self, fc_as_hex, address, values):
+        raise NotImplementedError("The proxy datastore is asynchronous")
+
+    def reset(self):
+        self.proxy.cache.clear()
+
+
+class WallboxProxy:
+    # Modbus TCP server that lets many clients share one connection to a charger.
+    # A poller refreshes the snapshot registers every poll_interval seconds, reads
+    # are answered from a register cache with a ttl of a few polls; only ranges that
+    # are not cached are read upstream, once for all clients that ask for them.
+    # Writes are passed through one at a time, in the order they arrive.
+
+    def __init__(self, wallbox, address='', port=5020, poll_interval=0.5, ttl=None) -> None:
+        self.wallbox = wallbox
+        self.address = address
+        self.port = port
+        self.poll_interval = poll_interval
+        ttl = 2 * poll_interval if ttl is None else ttl
+        self.cache = RegisterCache({
+            RegisterClass.CONFIGURATION: ttl,
+            RegisterClass.CONTROL: ttl,
+            RegisterClass.MEASUREMENT: ttl,
+        })
+        self.upstream_reads = 0
+        self.upstream_writes = 0
+        self.poll_errors = 0
+        self.server = ModbusTcpServer(
+            context=ModbusServerContext(slaves=_ProxySlaveContext(self), single=True),
+            address=(address, port),
+        )
+        self._reads = {}    # (address, count) -> task reading the range upstream
+        self._write_lock = asyncio.Lock()
+        self._poller = None
+
+    async def run(self):
+        await self.wallbox.connect()
+        self._poller = asyncio.create_task(self._poll())
+        try:
+            await self.server.serve_forever()
+        finally:
+            self._poller.cancel()
+
+    async def shutdown(self):
+        if self._poller is not None:
+            self._poller.cancel()
+        await self.server.shutdown()
+
+    async def read(self, address, count):
+        registers = self.cache.get(address, count)
+        if registers is not None:
+            return registers
+        task = self._reads.get((address, count))
+        if task is None:
+            task = self._reads[(address, count)] = asyncio.create_task(self._read_upstream(address, count))
+            task.add_done_callback(lambda _: self._reads.pop((address, count), None))
+        return await asyncio.shield(task)
+
+    async def write(self, address, values):
+        async with self._write_lock:
+            if len(values) == 1:
+                result = await self.wallbox._write_register(address, values[0])
+            else:
+                result = await self.wallbox._write_registers(address, values)
+            self.upstream_writes += 1
+            self.cache.invalidate(address, len(values))
+            if result.isError():
+                raise ModbusIOException(f"Write of {len(values)} registers at {address:#x} failed: {result}")
+            self.cache.put(address, values)
+
+    async def _read_upstream(self, address, count):
+        result = await self.wallbox._read(address, count)
+        self.upstream_reads += 1
+        if result.isError():
+            raise ModbusIOException(f"Read of {count} registers at {address:#x} failed: {result}")
+        self.cache.put(address, result.registers)
+        return result.registers
+
+    async def _poll(self):
+        while True:
+            # identity registers do not expire, they are read once
+            blocks = [
+                block for block in SNAPSHOT_BLOCKS
+                if register_class(block[0]) != RegisterClass.IDENTITY or self.cache.get(*block) is None
+            ]
+            try:
+                results = await self.wallbox._read_blocks(blocks)
+                self.upstream_reads += len(blocks)
+                for (address, _), result in zip(blocks, results):
+                    if not result.isError():
+                        self.cache.put(address, result.registers)
+            except (*CONNECTION_ERRORS, ModbusException):
+                self.poll_errors += 1
+            await asyncio.sleep(self.poll_interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Share one Modbus TCP connection to a charger")
+    parser.add_argument('host', help="charger host")
+    parser.add_argument('--port', type=int, default=502, help="charger port")
+    parser.add_argument('--listen', default='', help="address to accept clients on")
+    parser.add_argument('--listen-port', type=int, default=5020)
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args()
+    proxy = WallboxProxy(WallboxModbus(args.host, args.port), args.listen, args.listen_port, args.poll_interval)
+    await proxy.run()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+from functools import lru_cache
+
+# Modbus limits a single read_holding_registers request to 125 registers
+MAX_READ_COUNT = 125
+
+# Overhead of an extra read transaction, expressed in registers. A request plus
+# its response carries ~20 bytes of MBAP/PDU framing, every extra register read
+# costs 2 bytes. Gaps smaller than this are cheaper to read through than to skip.
+READ_REQUEST_COST = 10
+
+
+# Returns a tuple of (address, count) ranges that cover all addresses. The ranges
+# minimize `request_cost * requests + registers read`, never exceed max_count
+# registers and are computed once per set of addresses.
+def plan_reads(addresses, request_cost=READ_REQUEST_COST, max_count=MAX_READ_COUNT):
+    return _plan_reads(frozenset(int(address) for address in addresses), request_cost, max_count)
+
+
+@lru_cache(maxsize=256)
+def _plan_reads(addresses, request_cost, max_count):
+    addresses = sorted(addresses)
+    n = len(addresses)
+    # cost[i] is the cheapest cost of covering addresses[:i], start[i] the index
+    # at which the last range of that solution begins. Ties go to the longer
+    # range, so that fewer transactions are used.
+    cost = [0] + [float('inf')] * n
+    start = [0] * (n + 1)
+    for end in range(1, n + 1):
+        for begin in range(end - 1, -1, -1):
+            count = addresses[end - 1] - addresses[begin] + 1
+            if count > max_count:
+                break
+            candidate = cost[begin] + request_cost + count
+            if candidate <= cost[end]:
+                cost[end] = candidate
+                start[end] = begin
+    plan = []
+    end = n
+    while end > 0:
+        begin = start[end]
+        plan.append((addresses[begin], addresses[end - 1] - addresses[begin] + 1))
+        end = begin
+    return tuple(reversed(plan))
@@ -0,0 +1,125 @@
+import mmap
+import os
+import struct
+import time
+from wallbox_modbus.constants import SNAPSHOT_WIDTH
+from wallbox_modbus.snapshot import WallboxSnapshot
+
+# File layout: a header followed by capacity fixed-width records. A record holds
+# the time of the poll and the raw registers of all snapshot blocks. The header
+# count is only updated once a record is complete, and once the ring is full
+# readers skip the slot the next record goes into, so readers in other processes
+# never see partial records. A full ring therefore holds capacity - 1 records.
+MAGIC = b'WBXREC01'
+HEADER = struct.Struct('<8sIIQ')    # magic, registers per record, capacity, records written
+RECORD = struct.Struct(f'<d{SNAPSHOT_WIDTH}H')
+COUNT_OFFSET = 16  # of the records written field in the header
+
+
+class SnapshotRecorder:
+
+    def __init__(self, path, capacity=86400) -> None:
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, SNAPSHOT_WIDTH, capacity, 0))
+            self._file.truncate(HEADER.size + capacity * RECORD.size)
+            self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self.capacity, self.count = _read_header(self._mmap)
+
+    def append(self, timestamp, blocks):
+        # blocks are the register lists as returned by WallboxModbus._read_all_registers
+        offset = HEADER.size + (self.count % self.capacity) * RECORD.size
+        RECORD.pack_into(self._mmap, offset, timestamp, *(value for block in blocks for value in block))
+        self.count += 1
+        struct.pack_into('<Q', self._mmap, COUNT_OFFSET, self.count)
+
+    async def record(self, wallbox) -> WallboxSnapshot:
+        # polls the charger once, records the registers and returns the snapshot
+        blocks = await wallbox._read_all_registers()
+        self.append(time.time(), blocks)
+        return WallboxSnapshot.from_registers(*blocks)
+
+    def close(self):
+        self._mmap.flush()
+        self._mmap.close()
+        self._file.close()
+
+
+class SnapshotRecording:
+    # Read-only view on a recording, may be opened while another process records.
+
+    def __init__(self, path) -> None:
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.capacity, _ = _read_header(self._mmap)
+        # zero-copy view on the records, in ring order
+        self.buffer = memoryview(self._mmap)[HEADER.size:HEADER.size + self.capacity * RECORD.size]
+
+    @property
+    def count(self):
+        return struct.unpack_from('<Q', self._mmap, COUNT_OFFSET)[0]
+
+    def __len__(self):
+        return _valid_range(self.count, self.capacity)[1]
+
+    def first_index(self):
+        # ring index of the oldest record
+        return _valid_range(self.count, self.capacity)[0]
+
+    def records(self, start_time=None, end_time=None):
+        # yields (timestamp, registers) oldest first, optionally limited to
+        # start_time <= timestamp < end_time
+        first, length = _valid_range(self.count, self.capacity)
+        for i in range(length):
+            record = RECORD.unpack_from(self.buffer, ((first + i) % self.capacity) * RECORD.size)
+            timestamp = record[0]
+            if start_time is not None and timestamp < start_time:
+                continue
+            if end_time is not None and timestamp >= end_time:
+                break
+            yield timestamp, record[1:]
+
+    def as_array(self):
+        # Returns a NumPy structured array ('timestamp', 'registers') on the
+        # mapped file, in ring order. Once the ring is full this includes the slot
+        # that is written next, (first_index() - 1) % capacity, which may hold a
+        # partial record; records() and between() leave it out. Requires numpy.
+        import numpy as np
+        dtype = np.dtype([('timestamp', '<f8'), ('registers', '<u2', (SNAPSHOT_WIDTH,))])
+        return np.frombuffer(self.buffer, dtype=dtype)[:min(self.count, self.capacity)]
+
+    def between(self, start_time, end_time):
+        # Returns the records with start_time <= timestamp < end_time, oldest
+        # first, as a NumPy structured array. Requires numpy.
+        import numpy as np
+        records = self.as_array()
+        first, length = _valid_range(self.count, self.capacity)
+        wrapped = max(first + length - self.capacity, 0)
+        parts = []
+        for part in (records[first:first + length], records[:wrapped]):
+            timestamps = part['timestamp']
+            start, end = np.searchsorted(timestamps, [start_time, end_time])
+            parts.append(part[start:end])
+        return parts[0] if not len(parts[1]) else np.concatenate(parts)
+
+    def close(self):
+        self.buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def _valid_range(count, capacity):
+    # (ring index of the oldest record, number of records) that are safe to read;
+    # once the ring is full the slot of record count may be half overwritten
+    if count < capacity:
+        return 0, count
+    return (count + 1) % capacity, capacity - 1
+
+
+def _read_header(buffer):
+    magic, width, capacity, count = HEADER.unpack_from(buffer)
+    if magic != MAGIC or width != SNAPSHOT_WIDTH:
+        raise ValueError('Not a snapshot recording, or recorded with a different register layout')
+    return capacity, count
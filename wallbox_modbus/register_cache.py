@@ -0,0 +1,66 @@
+import time
+from wallbox_modbus.constants import RegisterAddresses, RegisterClass
+
+# seconds a cached register value stays valid, None never expires
+DEFAULT_TTLS = {
+    RegisterClass.IDENTITY: None,
+    RegisterClass.CONFIGURATION: 10.0,
+    RegisterClass.CONTROL: 1.0,
+    RegisterClass.MEASUREMENT: 0.5,
+}
+
+# registers the charger changes as a side effect of writing another register
+DEPENDENT_REGISTERS = {
+    # setting control to user resets the auto charging and idle setpoint registers
+    RegisterAddresses.CONTROL: tuple(range(0x52, 0x58)),
+    # starting/stopping changes the charger state and (re)sets setpoints and measurements
+    RegisterAddresses.ACTION: tuple(range(0x100, 0x105)) + tuple(range(0x200, 0x21b)),
+}
+
+
+def register_class(address) -> RegisterClass:
+    if address < 0x50:
+        return RegisterClass.IDENTITY
+    if address < 0x100:
+        return RegisterClass.CONFIGURATION
+    if address < 0x200:
+        return RegisterClass.CONTROL
+    return RegisterClass.MEASUREMENT
+
+
+class RegisterCache:
+
+    def __init__(self, ttls=None, clock=time.monotonic) -> None:
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._values = {}  # address -> (value, expires_at)
+
+    # returns the cached values for a register range, or None unless all are fresh
+    def get(self, address, count=1):
+        now = self.clock()
+        values = []
+        for addr in range(address, address+count):
+            entry = self._values.get(addr)
+            if entry is None or (entry[1] is not None and entry[1] <= now):
+                self.misses += 1
+                return None
+            values.append(entry[0])
+        self.hits += 1
+        return values
+
+    def put(self, address, values):
+        now = self.clock()
+        for addr, value in enumerate(values, address):
+            ttl = self.ttls[register_class(addr)]
+            self._values[addr] = (value, None if ttl is None else now + ttl)
+
+    def invalidate(self, address, count=1):
+        for addr in range(address, address+count):
+            self._values.pop(addr, None)
+            for dependent in DEPENDENT_REGISTERS.get(addr, ()):
+                self._values.pop(dependent, None)
+
+    def clear(self):
+        self._values.clear()
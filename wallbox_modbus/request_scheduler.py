@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import time
+from enum import Enum
+from pymodbus.exceptions import ModbusException
+from wallbox_modbus.constants import IDENTITY_BLOCK, RegisterAddresses
+from wallbox_modbus.metrics import READ_HOLDING_REGISTERS
+
+
+class RequestPriority(int, Enum):
+    SAFETY = 0      # writes that stop or lock the charger
+    SETPOINT = 1    # all other writes
+    STATE = 2       # reads of configuration, control and measurement registers
+    IDENTITY = 3    # reads of firmware version, serial number and part number
+
+# writes scheduled as RequestPriority.SAFETY
+SAFETY_REGISTERS = frozenset([
+    RegisterAddresses.ACTION,
+    RegisterAddresses.CHARGER_LOCK_STATE,
+])
+
+# deadline set by request_deadline, overrides the deadline of the priority class
+_request_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class RequestDroppedError(ModbusException):
+    # not a connection error, a dropped request is not retried
+    pass
+
+
+def request_priority(function_code, blocks) -> RequestPriority:
+    if function_code != READ_HOLDING_REGISTERS:
+        address, count = blocks[0]
+        if any(address <= register < address + count for register in SAFETY_REGISTERS):
+            return RequestPriority.SAFETY
+        return RequestPriority.SETPOINT
+    identity_end = IDENTITY_BLOCK[0] + IDENTITY_BLOCK[1]
+    if all(IDENTITY_BLOCK[0] <= address and address + count <= identity_end for address, count in blocks):
+        return RequestPriority.IDENTITY
+    return RequestPriority.STATE
+
+
+@contextlib.contextmanager
+def request_deadline(seconds, clock=time.monotonic):
+    # with request_deadline(0.2): await wallbox.get_all_values()
+    # requests made in the block are dropped when not started within seconds
+    token = _request_deadline.set(clock() + seconds)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+class RequestScheduler:
+    # Limits the transactions in flight on a connection; waiting requests are started
+    # in order of RequestPriority, then in order of arrival. Reads that wait longer
+    # than their deadline, or that are pushed out of a full queue by more urgent
+    # requests, fail with RequestDroppedError. Writes are never dropped for overload.
+
+    def __init__(self, max_in_flight=1, max_queued=16, deadlines=None, clock=time.monotonic) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        # seconds a request of a priority class may wait before it is dropped
+        self.deadlines = dict(deadlines or {})
+        self.clock = clock
+        self.in_flight = 0
+        self.dropped = 0
+        self._queue = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self):
+        return sum(1 for _, _, future in self._queue if not future.done())
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority):
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._queue, entry)
+        self._shed_load()
+        deadline = self._deadline(priority)
+        try:
+            if deadline is None:
+                await future
+            else:
+                await asyncio.wait_for(asyncio.shield(future), max(deadline - self.clock(), 0))
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                return  # started at the deadline
+            self._drop(future, "Request dropped, deadline exceeded")
+            raise future.exception() from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()  # the slot was handed over already
+            else:
+                future.cancel()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        while self._queue and self.in_flight < self.max_in_flight:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _deadline(self, priority):
+        deadline = _request_deadline.get()
+        if deadline is None and self.deadlines.get(priority) is not None:
+            deadline = self.clock() + self.deadlines[priority]
+        return deadline
+
+    def _shed_load(self):
+        # drops the oldest waiting read of the least urgent class, until the queue fits
+        while self.queued > self.max_queued:
+            waiting = [entry for entry in self._queue if not entry[2].done() and entry[0] >= RequestPriority.STATE]
+            if not waiting:
+                return
+            priority = max(entry[0] for entry in waiting)
+            _, _, future = min(entry for entry in waiting if entry[0] == priority)
+            self._drop(future, "Request dropped, scheduler overloaded")
+
+    def _drop(self, future, message):
+        if not future.done():
+            self.dropped += 1
+            future.set_exception(RequestDroppedError(message))
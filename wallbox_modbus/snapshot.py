@@ -0,0 +1,75 @@
+from typing import NamedTuple
+from wallbox_modbus.codec import get_decoder
+from wallbox_modbus.constants import (
+    CHARGER_LOCK_STATE_BLOCK,
+    CONTROL_BLOCK,
+    IDENTITY_BLOCK,
+    MEASUREMENT_BLOCK,
+    Action,
+    AutoChargingDischarging,
+    ChargerLockState,
+    ChargerStates,
+    Control,
+    SetpointType,
+)
+
+
+class WallboxSnapshot(NamedTuple):
+    # All values of a charger as ints and enums, in register order. Being a tuple it
+    # is compact and cheap to create; strings are only rendered by as_dict().
+    firmware_version: int
+    serial_number: int
+    part_number: str            # the 12 raw characters, see format_part_number
+    control: Control
+    auto_charging_discharging: AutoChargingDischarging
+    setpoint_type: SetpointType
+    charger_lock_state: ChargerLockState
+    action: Action
+    current_setpoint: int
+    power_setpoint: int
+    max_available_current: int
+    max_available_power: int
+    ac_current_rms: int
+    ac_voltage_rms: int
+    ac_active_power_rms: int
+    charger_state: ChargerStates
+    state_of_charge: int
+
+    @classmethod
+    def from_registers(cls, identity, control, lock, measurements):
+        return cls._make(
+            get_decoder(*IDENTITY_BLOCK).decode(identity) +
+            get_decoder(*CONTROL_BLOCK).decode(control) +
+            get_decoder(*CHARGER_LOCK_STATE_BLOCK).decode(lock) +
+            get_decoder(*MEASUREMENT_BLOCK).decode(measurements)
+        )
+
+    def as_dict(self) -> dict:
+        # the dict as returned by WallboxModbus.get_all_values
+        return {
+            'firmware_version': self.firmware_version,
+            'serial_number': self.serial_number,
+            'part_number': format_part_number(self.part_number),
+
+            'control': 'user' if self.control == Control.USER else 'remote',
+            'is_auto_charging_discharging_enabled': self.auto_charging_discharging == AutoChargingDischarging.ENABLE,
+            'setpoint_type': 'current' if self.setpoint_type == SetpointType.CURRENT else 'power',
+
+            'is_charger_locked': self.charger_lock_state == ChargerLockState.LOCK,
+            'action': int(self.action),
+            'current_setpoint': self.current_setpoint,
+            'power_setpoint': self.power_setpoint,
+
+            'max_available_current': self.max_available_current,
+            'max_available_power': self.max_available_power,
+            'ac_current_rms': self.ac_current_rms,
+            'ac_voltage_rms': self.ac_voltage_rms,
+            'ac_active_power_rms': self.ac_active_power_rms,
+            'charger_state': ChargerStates(self.charger_state).name.lower(),
+            'state_of_charge': self.state_of_charge,
+        }
+
+
+def format_part_number(value):
+    # 12 characters as decoded from the part number registers
+    return f'{value[0:4]}-{value[4]}-{value[5]}-{value[6]}-{value[7]}-{value[8:11]}-{value[11]}'
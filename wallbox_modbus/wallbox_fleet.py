@@ -0,0 +1,87 @@
+import asyncio
+from typing import NamedTuple
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+
+
+class FleetResults(NamedTuple):
+    values: dict    # name -> result, for every charger that succeeded
+    errors: dict    # name -> exception, for every charger that failed or timed out
+
+
+class WallboxFleet:
+
+    def __init__(self, wallboxes, max_concurrency=64, timeout=5.0) -> None:
+        # wallboxes is either a dict of name -> WallboxModbus, or an iterable of
+        # WallboxModbus which are then named 'host:port'
+        if not isinstance(wallboxes, dict):
+            wallboxes = {f'{wallbox.host}:{wallbox.port}': wallbox for wallbox in wallboxes}
+        self.wallboxes = wallboxes
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_hosts(cls, hosts, port=502, max_concurrency=64, timeout=5.0, **kwargs):
+        return cls(
+            [WallboxModbus(host, port, **kwargs) for host in hosts],
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+        )
+
+    def __len__(self):
+        return len(self.wallboxes)
+
+    def __getitem__(self, name) -> WallboxModbus:
+        return self.wallboxes[name]
+
+    async def connect_all(self) -> FleetResults:
+        return await self.broadcast('connect')
+
+    def close(self):
+        for wallbox in self.wallboxes.values():
+            wallbox.close()
+
+    async def call(self, name, method, *args, **kwargs):
+        # run one WallboxModbus method on one charger, (re)connecting when needed
+        wallbox = self.wallboxes[name]
+        async with self._semaphore:
+            return await asyncio.wait_for(self._call(wallbox, method, args, kwargs), self.timeout)
+
+    async def broadcast(self, method, *args, **kwargs) -> FleetResults:
+        # run one WallboxModbus method on all chargers concurrently
+        names = list(self.wallboxes)
+        results = await asyncio.gather(
+            *(self.call(name, method, *args, **kwargs) for name in names),
+            return_exceptions=True,
+        )
+        values = {}
+        errors = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                errors[name] = result
+            else:
+                values[name] = result
+        return FleetResults(values, errors)
+
+    async def snapshot_all(self) -> FleetResults:
+        return await self.broadcast('get_snapshot')
+
+    async def snapshot_columns(self, out=None):
+        # Returns a FleetColumns with the raw registers of all chargers in one
+        # uint16 NumPy matrix; out may be the matrix of a previous sweep to reuse.
+        # Requires numpy.
+        from wallbox_modbus.fleet_columns import FleetColumns
+        columns = FleetColumns.allocate(self.wallboxes, out)
+        results = await self.broadcast('_read_all_registers')
+        for row, name in enumerate(columns.names):
+            if name in results.values:
+                columns.set_row(row, results.values[name])
+            else:
+                columns.registers[row] = 0
+        columns.errors = results.errors
+        return columns
+
+    @staticmethod
+    async def _call(wallbox, method, args, kwargs):
+        if method != 'connect':
+            await wallbox.connect()
+        return await getattr(wallbox, method)(*args, **kwargs)
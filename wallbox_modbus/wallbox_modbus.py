@@ -1,57 +1,351 @@
+import asyncio
+import functools
+import time
+from typing import NamedTuple
 from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from pymodbus.register_read_message import (
+    ReadHoldingRegistersRequest,
+    ReadHoldingRegistersResponse,
+)
+from pymodbus.register_write_message import (
+    WriteMultipleRegistersRequest,
+    WriteSingleRegisterRequest,
+)
+from wallbox_modbus.codec import get_decoder, register_format
 from wallbox_modbus.constants import (
+    CHARGER_LOCK_STATE_BLOCK,
+    CONTROL_BLOCK,
+    IDENTITY_BLOCK,
+    MEASUREMENT_BLOCK,
+    REGISTER_MAP,
     Action,
     AutoChargingDischarging,
     Control,
     ChargerLockState,
     ChargerStates,
     RegisterAddresses,
-    SetpointType,
+    RegisterType,
+)
+from wallbox_modbus.connection import CONNECTION_ERRORS
+from wallbox_modbus.metrics import (
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_REGISTER,
+    Transaction,
 )
+from wallbox_modbus.read_planner import plan_reads
+from wallbox_modbus.request_scheduler import request_priority
+from wallbox_modbus.snapshot import WallboxSnapshot, format_part_number
+
+# registers holding int16 values, all others are unsigned
+SIGNED_REGISTERS = frozenset(
+    address for address, register in REGISTER_MAP.items() if register.type == RegisterType.INT16
+)
+
+# reserved registers that may be written as 0 to join two writes into one transaction
+RESERVED_REGISTERS = frozenset([0x103])
+
+# settings accepted by WallboxModbus.apply
+SETTINGS = {
+    'control': RegisterAddresses.CONTROL,
+    'auto_charging_discharging': RegisterAddresses.AUTO_CHARGING_DISCHARGING,
+    'setpoint_type': RegisterAddresses.SETPOINT_TYPE,
+    'charger_lock_state': RegisterAddresses.CHARGER_LOCK_STATE,
+    'action': RegisterAddresses.ACTION,
+    'current_setpoint': RegisterAddresses.CURRENT_SETPOINT,
+    'power_setpoint': RegisterAddresses.POWER_SETPOINT,
+}
 
 class WallboxModbus:
 
-    def __init__(self, host, port=502) -> None:
+    def __init__(self, host, port=502, pipelined=True, cache=None, write_scheduler=None, hooks=None,
+                 reconnect=None, unit_id=1, client=None, request_scheduler=None, traffic_recorder=None) -> None:
+        if not 0 <= unit_id <= 255:
+            raise ValueError(f"Unit id {unit_id} is not within 0..255")
+        if reconnect is not None and client is not None:
+            # reconnecting would drop the connection of every handle sharing client
+            raise ValueError("A managed connection (reconnect) cannot use a shared client")
         self.host = host
         self.port = port
-        self.client = AsyncModbusTcpClient(host=host, port=port)
+        self.unit_id = unit_id
+        self.pipelined = pipelined
+        self.cache = cache  # optional RegisterCache
+        self.write_scheduler = write_scheduler  # optional WriteScheduler
+        self.hooks = list(hooks or [])  # TransactionHooks, e.g. TransactionMetrics
+        self.reconnect = reconnect  # optional ReconnectPolicy, for a managed connection
+        self.circuit_breaker = reconnect.circuit_breaker() if reconnect is not None else None
+        # optional RequestScheduler, lets control writes overtake queued polls
+        self.request_scheduler = request_scheduler
+        self.traffic_recorder = traffic_recorder  # optional TrafficRecorder, captures every exchange
+        # firmware version, serial number and part number registers, fixed while connected
+        self._identity = None
+        # client may be shared with other handles, e.g. for chargers behind one
+        # Modbus TCP gateway (see ModbusGateway); it is only closed by its owner
+        self._owns_client = client is None
+        self.client = client or AsyncModbusTcpClient(
+            host=host, port=port, on_reconnect_callback=self._clear_identity,
+            # a managed connection reconnects itself, with backoff
+            **({'reconnect_delay': 0} if reconnect is not None else {}),
+        )
 
     async def connect(self):
         if not self.client.connected:
+            if self.reconnect is not None:
+                self.circuit_breaker.check()
             await self.client.connect()
+            if self.reconnect is not None:
+                if self.client.connected:
+                    self.circuit_breaker.record_success()
+                else:
+                    self.circuit_breaker.record_failure()
+        if self.client.connected:
+            await self._get_identity()
 
     def close(self):
-        self.client.close()
+        if self._owns_client:
+            self.client.close()
 
     async def _read(self, address, count=1):
-        return await self.client.read_holding_registers(address, count, slave=1)
+        if self.cache is not None:
+            registers = self.cache.get(address, count)
+            if registers is not None:
+                return ReadHoldingRegistersResponse(registers)
+        result = await self._transaction(
+            READ_HOLDING_REGISTERS, [(address, count)],
+            self._read_holding_registers, address, count,
+        )
+        self._observe_result(address, result)
+        return result
+
+    async def _read_blocks(self, blocks):
+        # blocks is a sequence of (address, count) tuples, results are returned in the same order
+        results = [None] * len(blocks)
+        if self.cache is not None:
+            for i, (address, count) in enumerate(blocks):
+                registers = self.cache.get(address, count)
+                if registers is not None:
+                    results[i] = ReadHoldingRegistersResponse(registers)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if self.pipelined and len(missing) > 1:
+            missing_blocks = [blocks[i] for i in missing]
+            fetched = await self._transaction(
+                READ_HOLDING_REGISTERS, missing_blocks, self._read_pipelined, missing_blocks,
+            )
+        else:
+            fetched = [
+                await self._transaction(
+                    READ_HOLDING_REGISTERS, [blocks[i]], self._read_holding_registers, *blocks[i],
+                )
+                for i in missing
+            ]
+        for i, result in zip(missing, fetched):
+            self._observe_result(blocks[i][0], result)
+            results[i] = result
+        return results
+
+    async def _read_value(self, address):
+        register = register_format(address)
+        result = await self._read(address, register.width)
+        return get_decoder(address, register.width, (address,)).decode(result.registers)[0]
+
+    def _observe_result(self, address, result):
+        if result.isError():
+            return
+        if self.cache is not None:
+            self.cache.put(address, result.registers)
+        if self.write_scheduler is not None:
+            self.write_scheduler.observe(address, result.registers)
+
+    async def _read_pipelined(self, blocks):
+        # Send all requests before waiting for any response, so that a multi-block
+        # read costs one round trip. Responses are matched up by transaction id.
+        pending = [self._send(ReadHoldingRegistersRequest(address, count)) for address, count in blocks]
+        return await self._receive(pending)
+
+    def _send(self, request):
+        # Sends request without waiting for earlier requests on the (possibly
+        # shared) client to complete; returns the (request, response future) pair.
+        client = self.client
+        if not client.transport:
+            raise ConnectionException(f"Not connected[{client!s}]")
+        request.slave_id = self.unit_id
+        request.transaction_id = client.transaction.getNextTID()
+        return request, self._transmit(request)
+
+    def _transmit(self, request):
+        client = self.client
+        response = client.build_response(request.transaction_id)
+        client.send(client.framer.buildPacket(request))
+        if self.traffic_recorder is not None:
+            response.add_done_callback(functools.partial(
+                self.traffic_recorder.on_response, request, time.time(), time.perf_counter(),
+            ))
+        return response
+
+    async def _receive(self, pending):
+        # Waits for the responses to pending (request, response) pairs. Like pymodbus,
+        # unanswered requests are sent again up to client.retries times, after which
+        # the connection is closed to be rebuilt. A managed connection leaves
+        # replaying and reconnecting to _transaction.
+        client = self.client
+        retries = client.retries if self.reconnect is None else 0
+        responses = [response for _, response in pending]
+        for attempt in range(retries + 1):
+            if attempt:
+                for i, (request, _) in enumerate(pending):
+                    if responses[i].cancelled():
+                        responses[i] = self._transmit(request)
+            try:
+                return await asyncio.wait_for(asyncio.gather(*responses), client.comm_params.timeout_connect)
+            except asyncio.TimeoutError:
+                pass
+        for request, _ in pending:
+            client.transaction.delTransaction(request.transaction_id)
+        if self.reconnect is None:
+            client.close(reconnect=True)
+        raise ModbusIOException(f"ERROR: No response received from unit {self.unit_id} after {retries} retries")
+
+    async def _transaction(self, function_code, blocks, request, *args):
+        # Performs request(*args), the Modbus transaction(s) for blocks. With a
+        # reconnect policy, the connection is restored when needed and failed reads
+        # are replayed; an open circuit breaker fails fast.
+        if self.reconnect is None:
+            return await self._scheduled(function_code, blocks, request, *args)
+        self.circuit_breaker.check()
+        attempt = 0
+        while True:
+            try:
+                if not self.client.connected:
+                    await self._reconnect()
+                result = await self._scheduled(function_code, blocks, request, *args)
+            except CONNECTION_ERRORS:
+                self.circuit_breaker.record_failure()
+                # a timeout leaves the socket looking connected; drop it, so that
+                # the next attempt starts on a fresh connection
+                self.client.close()
+                if (function_code != READ_HOLDING_REGISTERS or attempt >= self.reconnect.retries
+                        or not self.circuit_breaker.allow()):
+                    raise
+                await asyncio.sleep(self.reconnect.delay(attempt))
+                attempt += 1
+                continue
+            self.circuit_breaker.record_success()
+            return result
+
+    async def _scheduled(self, function_code, blocks, request, *args):
+        if self.request_scheduler is None:
+            return await self._instrumented(function_code, blocks, request(*args))
+        async with self.request_scheduler.slot(request_priority(function_code, blocks)):
+            return await self._instrumented(function_code, blocks, request(*args))
+
+    async def _instrumented(self, function_code, blocks, request):
+        # Awaits request and reports every block to the hooks. request returns a
+        # response, or a list of responses in the order of blocks.
+        if not self.hooks:
+            return await request
+        start = time.perf_counter()
+        result = None
+        timeout = False
+        try:
+            result = await request
+            return result
+        except (asyncio.TimeoutError, ModbusIOException):
+            timeout = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            results = result if isinstance(result, list) else [result] * len(blocks)
+            for (address, count), response in zip(blocks, results):
+                transaction = Transaction(
+                    function_code, address, count, duration,
+                    not timeout and (response is None or response.isError()), timeout,
+                )
+                for hook in self.hooks:
+                    hook.on_transaction(transaction)
+
+    async def _reconnect(self):
+        self.client.close()
+        if not await self.client.connect():
+            raise ConnectionException(f"Failed to connect[{self.client!s}]")
+
+    async def _read_holding_registers(self, address, count):
+        (response,) = await self._receive([self._send(ReadHoldingRegistersRequest(address, count))])
+        return response
+
+    async def _write_single_register(self, address, value):
+        (response,) = await self._receive([self._send(WriteSingleRegisterRequest(address, value))])
+        return response
+
+    async def _write_multiple_registers(self, address, values):
+        (response,) = await self._receive([self._send(WriteMultipleRegistersRequest(address, values))])
+        return response
+
+    async def _get_identity(self):
+        if self._identity is None:
+            result = await self._read(RegisterAddresses.FIRMWARE_VERSION, 9)
+            if not result.isError():
+                self._identity = result.registers
+            return result.registers
+        return self._identity
+
+    def _clear_identity(self):
+        # called on every (re)connect, the charger may have changed in between
+        self._identity = None
+        if self.cache is not None:
+            self.cache.invalidate(RegisterAddresses.FIRMWARE_VERSION, 9)
+        if self.write_scheduler is not None:
+            self.write_scheduler.clear()
 
     async def _write(self, address, value):
-        return await self.client.write_register(address, value, slave=1)
+        if self.write_scheduler is not None:
+            return await self.write_scheduler.write(address, value, self._write_register)
+        return await self._write_register(address, value)
+
+    async def _write_register(self, address, value):
+        try:
+            return await self._transaction(
+                WRITE_SINGLE_REGISTER, [(address, 1)], self._write_single_register, address, value,
+            )
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(address)
+
+    async def _write_registers(self, address, values):
+        try:
+            result = await self._transaction(
+                WRITE_MULTIPLE_REGISTERS, [(address, len(values))], self._write_multiple_registers, address, values,
+            )
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(address, len(values))
+        if self.write_scheduler is not None and not result.isError():
+            self.write_scheduler.written(address, values)
+        return result
 
     ### Firmware version ###
 
     async def get_firmware_version(self):
-        result = await self._read(RegisterAddresses.FIRMWARE_VERSION)
-        return result.registers[0]
+        identity = await self._get_identity()
+        return get_decoder(*IDENTITY_BLOCK).decode(identity)[0]
 
     ### Serial number ###
 
     async def get_serial_number(self):
-        result = await self._read(RegisterAddresses.SERIAL_HIGH, 2)
-        return to_serial_number(result.registers)
+        identity = await self._get_identity()
+        return get_decoder(*IDENTITY_BLOCK).decode(identity)[1]
 
     ### Part number ###
 
     async def get_part_number(self):
-        result = await self._read(RegisterAddresses.PART_NUMBER_1, 6)
-        return to_part_number(result.registers)
+        identity = await self._get_identity()
+        return format_part_number(get_decoder(*IDENTITY_BLOCK).decode(identity)[2])
 
     ### Control ###
 
     async def has_control(self):
-        result = await self._read(RegisterAddresses.CONTROL)
-        return result.registers[0] == Control.REMOTE
+        value = await self._read_value(RegisterAddresses.CONTROL)
+        return value == Control.REMOTE
 
     async def release_control(self):
         await self._write(RegisterAddresses.CONTROL, Control.USER)
@@ -62,8 +356,8 @@ class WallboxModbus:
     ### Auto charging/discharging ###
 
     async def is_auto_charging_discharging_enabled(self):
-        result = await self._read(RegisterAddresses.AUTO_CHARGING_DISCHARGING)
-        return result.registers[0] == AutoChargingDischarging.ENABLE
+        value = await self._read_value(RegisterAddresses.AUTO_CHARGING_DISCHARGING)
+        return value == AutoChargingDischarging.ENABLE
 
     async def disable_auto_charging_discharging(self):
         await self._write(RegisterAddresses.AUTO_CHARGING_DISCHARGING, AutoChargingDischarging.DISABLE)
@@ -74,8 +368,7 @@ class WallboxModbus:
     ### Setpoint type ###
 
     async def get_setpoint_type(self):
-        result = await self._read(RegisterAddresses.SETPOINT_TYPE)
-        return result.registers[0]
+        return await self._read_value(RegisterAddresses.SETPOINT_TYPE)
 
     async def set_setpoint_type(self, setpoint_type):
         await self._write(RegisterAddresses.SETPOINT_TYPE, setpoint_type)
@@ -83,8 +376,8 @@ class WallboxModbus:
     ### Charger lock state ###
 
     async def is_charger_locked(self):
-        result = await self._read(RegisterAddresses.CHARGER_LOCK_STATE)
-        return result.registers[0] == ChargerLockState.LOCK
+        value = await self._read_value(RegisterAddresses.CHARGER_LOCK_STATE)
+        return value == ChargerLockState.LOCK
 
     async def lock_charger(self):
         await self._write(RegisterAddresses.CHARGER_LOCK_STATE, ChargerLockState.LOCK)
@@ -95,9 +388,7 @@ class WallboxModbus:
     ### Action ###
 
     async def is_charging_discharging(self) -> int:
-        result = await self._read(RegisterAddresses.CHARGER_LOCK_STATE)
-        print('is_charging_discharging', result.registers[0])
-        return result.registers[0]
+        return await self._read_value(RegisterAddresses.CHARGER_LOCK_STATE)
 
     async def start_charging_discharging(self):
         await self._write(RegisterAddresses.ACTION, Action.START_CHARGING_DISCHARGING)
@@ -107,15 +398,16 @@ class WallboxModbus:
 
     async def reboot_charger(self):
         await self._write(RegisterAddresses.ACTION, Action.REBOOT_CHARGER)
+        self._clear_identity()
 
     async def update_firmware(self):
         await self._write(RegisterAddresses.ACTION, Action.UPDATE_FIRMWARE)
+        self._clear_identity()
 
     ### Current setpoint ###
 
     async def get_current_setpoint(self) -> int:
-        result = await self._read(RegisterAddresses.CURRENT_SETPOINT)
-        return uint16_to_int16(result.registers[0])
+        return await self._read_value(RegisterAddresses.CURRENT_SETPOINT)
 
     async def set_current_setpoint(self, value: int):
         await self._write(RegisterAddresses.CURRENT_SETPOINT, int16_to_uint16(value))
@@ -123,8 +415,7 @@ class WallboxModbus:
     ### Power setpoint ###
 
     async def get_power_setpoint(self) -> int:
-        result = await self._read(RegisterAddresses.POWER_SETPOINT)
-        return uint16_to_int16(result.registers[0])
+        return await self._read_value(RegisterAddresses.POWER_SETPOINT)
 
     async def set_power_setpoint(self, value: int):
         await self._write(RegisterAddresses.POWER_SETPOINT, int16_to_uint16(value))
@@ -132,82 +423,163 @@ class WallboxModbus:
     ### Max available current / power
 
     async def get_max_available_current(self) -> int:
-        result = await self._read(RegisterAddresses.MAX_AVAILABLE_CURRENT)
-        return result.registers[0]
+        return await self._read_value(RegisterAddresses.MAX_AVAILABLE_CURRENT)
 
     async def get_max_available_power(self) -> int:
-        result = await self._read(RegisterAddresses.MAX_AVAILABLE_POWER)
-        return result.registers[0]
+        return await self._read_value(RegisterAddresses.MAX_AVAILABLE_POWER)
 
     ### AC current / voltage / active power RMS
 
     async def get_ac_current_rms(self) -> int:
-        result = await self._read(RegisterAddresses.AC_CURRENT_RMS)
-        return uint16_to_int16(result.registers[0])
+        return await self._read_value(RegisterAddresses.AC_CURRENT_RMS)
 
     async def get_ac_voltage_rms(self) -> int:
-        result = await self._read(RegisterAddresses.AC_VOLTAGE_RMS)
-        return result.registers[0]
+        return await self._read_value(RegisterAddresses.AC_VOLTAGE_RMS)
 
     async def get_ac_active_power_rms(self) -> int:
-        result = await self._read(RegisterAddresses.AC_ACTIVE_POWER_RMS)
-        return uint16_to_int16(result.registers[0])
+        return await self._read_value(RegisterAddresses.AC_ACTIVE_POWER_RMS)
 
     ### Charger state ###
 
     async def is_car_connected(self) -> bool:
-        result = await self._read(RegisterAddresses.CHARGER_STATE)
-        return result.registers[0] != ChargerStates.NO_CAR_CONNECTED
+        value = await self._read_value(RegisterAddresses.CHARGER_STATE)
+        return value != ChargerStates.NO_CAR_CONNECTED
 
     ### State of charge ###
 
     async def get_state_of_charge(self) -> int:
-        result = await self._read(RegisterAddresses.STATE_OF_CHARGE)
-        return result.registers[0]
+        return await self._read_value(RegisterAddresses.STATE_OF_CHARGE)
 
     ### All ###
 
     async def get_all_values(self) -> dict:
-        result0 = await self._read(RegisterAddresses.FIRMWARE_VERSION, 9)
-        result1 = await self._read(RegisterAddresses.CONTROL, 3)
-        result2 = await self._read(RegisterAddresses.CHARGER_LOCK_STATE, 5)
-        result3 = await self._read(RegisterAddresses.MAX_AVAILABLE_CURRENT, 27)
-        return {
-            'firmware_version': result0.registers[0],
-            'serial_number': to_serial_number(result0.registers[1:3]),
-            'part_number': to_part_number(result0.registers[3:10]),
-
-            'control': 'user' if result1.registers[0] == Control.USER else 'remote',
-            'is_auto_charging_discharging_enabled': result1.registers[1] == AutoChargingDischarging.ENABLE,
-            'setpoint_type': 'current' if result1.registers[2] == SetpointType.CURRENT else 'power',
-
-            'is_charger_locked': result2.registers[0] == ChargerLockState.LOCK,
-            'action': result2.registers[1],
-            'current_setpoint': uint16_to_int16(result2.registers[2]),
-            'power_setpoint': uint16_to_int16(result2.registers[4]),
-
-            'max_available_current': result3.registers[0],
-            'max_available_power': result3.registers[2],
-            'ac_current_rms': uint16_to_int16(result3.registers[7]),
-            'ac_voltage_rms': result3.registers[10],
-            'ac_active_power_rms': uint16_to_int16(result3.registers[14]),
-            'charger_state': ChargerStates._value2member_map_[result3.registers[25]].name.lower(),
-            'state_of_charge': result3.registers[26],
+        return (await self.get_snapshot()).as_dict()
+
+    async def get_snapshot(self) -> WallboxSnapshot:
+        return WallboxSnapshot.from_registers(*await self._read_all_registers())
+
+    async def _read_all_registers(self):
+        # returns the raw identity, control, charger lock state and measurement registers
+        blocks = [CONTROL_BLOCK, CHARGER_LOCK_STATE_BLOCK, MEASUREMENT_BLOCK]
+        identity = self._identity
+        if identity is None:
+            blocks.insert(0, IDENTITY_BLOCK)
+        results = await self._read_blocks(blocks)
+        for (address, count), result in zip(blocks, results):
+            if result.isError():
+                raise ModbusIOException(
+                    f"ERROR: Read of {count} registers at {int(address):#x} from unit {self.unit_id} failed: {result}"
+                )
+        if identity is None:
+            identity = self._identity = results.pop(0).registers
+        return (identity, *(result.registers for result in results))
+
+    ### Watch ###
+
+    async def watch(self, interval=1.0, fast_interval=None, idle_interval=None):
+        # Async generator yielding a WallboxChange for every poll in which any value
+        # changed; the first poll reports all values. Polls every fast_interval while
+        # charging/discharging or while values are moving, and backs off towards
+        # idle_interval while no car is connected and nothing changes.
+        fast_interval = interval / 4 if fast_interval is None else fast_interval
+        idle_interval = interval * 8 if idle_interval is None else idle_interval
+        previous_registers = None
+        previous_values = {}
+        delay = interval
+        while True:
+            registers = await self._read_all_registers()
+            timestamp = time.time()
+            changed = registers != previous_registers
+            if changed:
+                values = WallboxSnapshot.from_registers(*registers).as_dict()
+                changes = {
+                    field: (previous_values.get(field), value)
+                    for field, value in values.items()
+                    if previous_values.get(field) != value or previous_registers is None
+                }
+                previous_registers = registers
+                previous_values = values
+                yield WallboxChange(timestamp, changes)
+            charger_state = registers[3][25]
+            if changed or charger_state in (ChargerStates.CHARGING, ChargerStates.DISCHARGING):
+                delay = fast_interval
+            elif charger_state == ChargerStates.NO_CAR_CONNECTED:
+                delay = min(max(delay, interval) * 2, idle_interval)
+            else:
+                delay = interval
+            await asyncio.sleep(delay)
+
+    ### Any ###
+
+    async def get_values(self, fields) -> dict:
+        fields = [RegisterAddresses(field) for field in fields]
+        plan = plan_reads(
+            address
+            for field in fields
+            for address in range(field, field + register_format(field).width)
+        )
+        results = await self._read_blocks(plan)
+        values = {}
+        for (address, count), result in zip(plan, results):
+            block_fields = tuple(sorted(field for field in fields if address <= field < address + count))
+            values.update(get_decoder(address, count, block_fields).decode_dict(result.registers))
+        if RegisterAddresses.PART_NUMBER_1 in values:
+            # formatted, like get_part_number
+            values[RegisterAddresses.PART_NUMBER_1] = format_part_number(values[RegisterAddresses.PART_NUMBER_1])
+        return {field: values[field] for field in fields}
+
+    ### Apply ###
+
+    async def apply(self, verify=False, **settings):
+        # Writes several settings (see SETTINGS) at once, using a single FC16
+        # transaction per group of adjacent registers. With verify, the written
+        # registers are read back in one coalesced read and compared.
+        unknown = set(settings) - set(SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        registers = {
+            SETTINGS[name]: int16_to_uint16(int(value)) if SETTINGS[name] in SIGNED_REGISTERS else int(value)
+            for name, value in settings.items()
         }
-
-
-def to_serial_number(values):
-    return (values[0]<<16) + values[1]
-
-def to_part_number(values):
-    return (
-        chr(0xff & (values[0]>>8)) + chr(0xff & values[0]) +
-        chr(0xff & (values[1]>>8)) + chr(0xff & values[1]) + '-' +
-        chr(0xff & (values[2]>>8)) + '-' + chr(0xff & values[2]) + '-' +
-        chr(0xff & (values[3]>>8)) + '-' + chr(0xff & values[3]) + '-' +
-        chr(0xff & (values[4]>>8)) + chr(0xff & values[4]) +
-        chr(0xff & (values[5]>>8)) + '-' + chr(0xff & values[5])
-    )
+        for address, values in to_write_groups(registers):
+            await self._write_registers(address, values)
+        if settings.get('action') in (Action.REBOOT_CHARGER, Action.UPDATE_FIRMWARE):
+            self._clear_identity()
+        if verify:
+            expected = {
+                address: uint16_to_int16(value) if address in SIGNED_REGISTERS else value
+                for address, value in registers.items()
+            }
+            actual = await self.get_values(expected)
+            mismatches = [
+                f"{address.name}: {expected[address]} != {actual[address]}"
+                for address in expected if expected[address] != actual[address]
+            ]
+            if mismatches:
+                raise ModbusIOException(f"ERROR: Settings not applied ({', '.join(mismatches)})")
+
+
+class WallboxChange(NamedTuple):
+    timestamp: float
+    changes: dict   # field -> (old value, new value)
+
+
+def to_write_groups(registers):
+    # groups a dict of address -> value into (address, values) runs of adjacent
+    # registers, bridging single reserved registers
+    groups = []
+    for address in sorted(registers):
+        if groups:
+            start, values = groups[-1]
+            end = start + len(values)
+            if address == end:
+                values.append(registers[address])
+                continue
+            if address == end + 1 and end in RESERVED_REGISTERS:
+                values.extend([0, registers[address]])
+                continue
+        groups.append((address, [registers[address]]))
+    return groups
 
 
 MAX_USI = 65536
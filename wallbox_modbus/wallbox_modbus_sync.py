@@ -0,0 +1,70 @@
+import asyncio
+import inspect
+import threading
+from wallbox_modbus.wallbox_modbus import WallboxModbus
+
+
+class WallboxModbusSync:
+    # Blocking facade for WallboxModbus, for synchronous code. A background thread
+    # runs one event loop that keeps the connection open between calls. Every
+    # coroutine method of WallboxModbus is available as a blocking method, and
+    # connects first when needed.
+
+    def __init__(self, host, port=502, timeout=10.0, **kwargs) -> None:
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f'wallbox-{host}:{port}', daemon=True)
+        self._thread.start()
+        self.wallbox = self._run(self._create(host, port, kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(WallboxModbus, name, None)
+        if name.startswith('_') or not inspect.iscoroutinefunction(method):
+            raise AttributeError(name)
+        def call(*args, **kwargs):
+            return self._run(self._call(name, args, kwargs))
+        call.__name__ = name
+        return call
+
+    def watch(self, *args, **kwargs):
+        # blocking iterator over WallboxModbus.watch
+        self._run(self.wallbox.connect())
+        watcher = self.wallbox.watch(*args, **kwargs)
+        try:
+            while True:
+                yield asyncio.run_coroutine_threadsafe(anext(watcher), self._loop).result()
+        finally:
+            self._run(watcher.aclose())
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self.wallbox.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+    def _run(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            # the coroutine would otherwise keep running, and keep the connection busy
+            future.cancel()
+            raise
+
+    @staticmethod
+    async def _create(host, port, kwargs):
+        # created within the loop, the client binds to it
+        return WallboxModbus(host, port, **kwargs)
+
+    async def _call(self, name, args, kwargs):
+        if name != 'connect':
+            await self.wallbox.connect()
+        return await getattr(self.wallbox, name)(*args, **kwargs)
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from wallbox_modbus.constants import RegisterAddresses
+from wallbox_modbus.register_cache import DEPENDENT_REGISTERS
+
+# writes that are sent straight away, never delayed by the debounce window
+IMMEDIATE_REGISTERS = frozenset([
+    RegisterAddresses.ACTION,
+    RegisterAddresses.CHARGER_LOCK_STATE,
+])
+
+# command registers, writing the same value again is not redundant
+COMMAND_REGISTERS = frozenset([
+    RegisterAddresses.ACTION,
+])
+
+
+class _PendingWrite:
+
+    def __init__(self, value) -> None:
+        self.value = value
+        self.done = asyncio.get_running_loop().create_future()
+        # mark exceptions as retrieved, there may be no other writers waiting
+        self.done.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+
+class WriteScheduler:
+
+    def __init__(self, window=0.0, max_age=5.0, clock=time.monotonic) -> None:
+        # writes to the same register within window seconds are merged, only the
+        # newest value is sent
+        self.window = window
+        # a write is only skipped as redundant when the known value is at most
+        # max_age seconds old, the charger may have changed it since
+        self.max_age = max_age
+        self.clock = clock
+        self.sent = 0
+        self.skipped = 0
+        self.merged = 0
+        self._last_values = {}  # address -> (last known register value, clock() when known)
+        self._pending = {}      # address -> _PendingWrite
+
+    async def write(self, address, value, send):
+        # send is a coroutine function (address, value) that performs the actual write
+        if address in IMMEDIATE_REGISTERS or self.window <= 0:
+            result = await self._send(address, value, send)
+            self._supersede(address)
+            return result
+        pending = self._pending.get(address)
+        if pending is not None:
+            pending.value = value
+            self.merged += 1
+            return await asyncio.shield(pending.done)
+        pending = self._pending[address] = _PendingWrite(value)
+        try:
+            await asyncio.sleep(self.window)
+            if self._pending.get(address) is not pending:
+                # superseded by a direct write in the meantime
+                return await asyncio.shield(pending.done)
+            del self._pending[address]
+            result = await self._send(address, pending.value, send)
+        except BaseException as e:
+            if self._pending.get(address) is pending:
+                del self._pending[address]
+            if not pending.done.done():
+                pending.done.set_exception(e)
+            raise
+        pending.done.set_result(result)
+        return result
+
+    def observe(self, address, values):
+        # records register values read from, or written to, the charger
+        now = self.clock()
+        for addr, value in enumerate(values, address):
+            self._last_values[addr] = (value, now)
+
+    def written(self, address, values):
+        # records a write done outside the scheduler, pending writes to the same
+        # registers are dropped
+        now = self.clock()
+        for addr, value in enumerate(values, address):
+            self._forget(addr)
+            self._last_values[addr] = (value, now)
+            self._supersede(addr)
+
+    def clear(self):
+        # forgets all known values, e.g. after a reconnect
+        self._last_values.clear()
+
+    async def _send(self, address, value, send):
+        if address not in COMMAND_REGISTERS and self._is_known(address, value):
+            self.skipped += 1
+            return None
+        self._forget(address)
+        result = await send(address, value)
+        self.sent += 1
+        if not result.isError():
+            self._last_values[address] = (value, self.clock())
+        return result
+
+    def _is_known(self, address, value):
+        known = self._last_values.get(address)
+        return known is not None and known[0] == value and self.clock() - known[1] <= self.max_age
+
+    def _forget(self, address):
+        self._last_values.pop(address, None)
+        for dependent in DEPENDENT_REGISTERS.get(address, ()):
+            self._last_values.pop(dependent, None)
+
+    def _supersede(self, address):
+        pending = self._pending.pop(address, None)
+        if pending is not None and not pending.done.done():
+            pending.done.set_result(None)